@@ -11,10 +11,19 @@ Key Findings:
 - Readings data: y_YYYY.json (available from 2004-present)  
 - Data structure includes: name, yomi (reading), rank, sex (m/f), code
 - Additional kanji rankings available in nameListKanji.json
+
+usage: python get-meiji.py [workers]
+(the year files are parsed in that many processes, default one per CPU)
 """
 
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import pandas as pd
 from pathlib import Path
 import time
@@ -33,6 +42,31 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# file prefix -> data_type
+DATA_TYPES = {'n': 'names', 'y': 'readings'}
+
+def _parse_year_file(file_path: Path) -> Optional[List[Dict]]:
+    """Parse an n_YYYY.json or y_YYYY.json file into records tagged with year and type.
+
+    Defined at module level so it can be run in worker processes.
+    """
+    prefix, year = file_path.stem.split('_')[:2]
+    data_type = DATA_TYPES[prefix]
+    try:
+        year = int(year)
+    except ValueError:
+        return None
+    
+    try:
+        with open(file_path, 'rb') as f:
+            data = orjson.loads(f.read())
+        
+        return [{**record, 'year': year, 'data_type': data_type} for record in data]
+        
+    except Exception as e:
+        logger.error(f"Error processing {data_type} file for {year}: {e}")
+        return None
+
 class MeijiYasudaScraper:
     """
     Scraper for Meiji Yasuda baby names ranking data.
@@ -55,6 +89,12 @@ class MeijiYasudaScraper:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
+        # Keep connections alive and let urllib3 retry transient server errors
+        retry = Retry(total=3, backoff_factor=1,
+                      status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20,
+                              max_retries=retry)
+        self.session.mount('https://', adapter)
         
         # Historical ranges found in JavaScript
         self.names_start_year = 1912  # Names data starts from 1912
@@ -63,52 +103,116 @@ class MeijiYasudaScraper:
         
         logger.info(f"Initialized scraper. Output directory: {self.output_dir}")
         
-    def download_file(self, filename: str, save_path: Path, retries: int = 3) -> bool:
-        """Download a single JSON file with retry logic."""
+    def _meta_path(self, save_path: Path) -> Path:
+        """Sidecar file holding the HTTP cache validators for save_path."""
+        return save_path.with_name(save_path.name + '.meta')
+    
+    def _conditional_headers(self, save_path: Path) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a file we already have."""
+        meta_path = self._meta_path(save_path)
+        if not (save_path.exists() and meta_path.exists()):
+            return {}
+        try:
+            meta = orjson.loads(meta_path.read_bytes())
+        except orjson.JSONDecodeError:
+            return {}
+        
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+    
+    def _save_meta(self, save_path: Path, headers) -> None:
+        """Remember the ETag / Last-Modified of a successful download."""
+        meta = {'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified')}
+        self._meta_path(save_path).write_bytes(orjson.dumps(meta))
+    
+    def download_file(self, filename: str, save_path: Path) -> bool:
+        """Download a single JSON file (retries are handled by the session adapter)."""
         url = f"{self.base_url}{filename}"
         
-        for attempt in range(retries):
-            try:
-                logger.info(f"Downloading {filename} (attempt {attempt + 1}/{retries})")
-                response = self.session.get(url, timeout=30)
-                
-                if response.status_code == 200:
-                    # Validate JSON
-                    data = response.json()
-                    
-                    # Save raw data
-                    with open(save_path, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                    
-                    logger.info(f"✓ Successfully downloaded {filename}")
-                    return True
-                    
-                elif response.status_code == 404:
-                    logger.warning(f"✗ File not found: {filename}")
-                    return False
-                    
-                else:
-                    logger.warning(f"✗ HTTP {response.status_code} for {filename}")
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"✗ Network error downloading {filename}: {e}")
-            except json.JSONDecodeError as e:
-                logger.error(f"✗ Invalid JSON in {filename}: {e}")
-            except Exception as e:
-                logger.error(f"✗ Unexpected error downloading {filename}: {e}")
+        try:
+            logger.info(f"Downloading {filename}")
+            response = self.session.get(url, timeout=30,
+                                        headers=self._conditional_headers(save_path))
             
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
+            if response.status_code == 200:
+                # Validate JSON, then save the response exactly as served
+                orjson.loads(response.content)
+                save_path.write_bytes(response.content)
+                self._save_meta(save_path, response.headers)
+                
+                logger.info(f"✓ Successfully downloaded {filename}")
+                return True
+                
+            elif response.status_code == 304:
+                logger.info(f"⚪ {filename} not modified")
+                return True
+                
+            elif response.status_code == 404:
+                logger.warning(f"✗ File not found: {filename}")
+                
+            else:
+                logger.warning(f"✗ HTTP {response.status_code} for {filename}")
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"✗ Network error downloading {filename}: {e}")
+        except json.JSONDecodeError as e:
+            logger.error(f"✗ Invalid JSON in {filename}: {e}")
+        except Exception as e:
+            logger.error(f"✗ Unexpected error downloading {filename}: {e}")
                 
         return False
     
-    def download_names_data(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> Dict[int, bool]:
+    def _download_years(self, prefix: str, subdir: str, start_year: int, end_year: int,
+                        concurrency: int = 8, refresh: bool = False) -> Dict[int, bool]:
+        """
+        Download the yearly files prefix_YYYY.json into subdir concurrently.
+        
+        The threads share self.session, whose adapter pools the connections
+        and retries transient errors; at most `concurrency` requests are in
+        flight at once.  Files already on disk are skipped, except for the
+        current year (which may still change) or when `refresh` is set;
+        those are revalidated with a conditional GET.
+        """
+        results = {}
+        
+        def fetch(year, filename, save_path):
+            success = self.download_file(filename, save_path)
+            time.sleep(0.1)  # Be respectful to the server
+            return year, success
+        
+        jobs = []
+        for year in range(start_year, end_year + 1):
+            filename = f"{prefix}_{year}.json"
+            save_path = self.output_dir / subdir / filename
+            
+            if save_path.exists() and not refresh and year < self.current_year:
+                logger.info(f"⚪ Skipping {filename} (already exists)")
+                results[year] = True
+                continue
+            
+            jobs.append((year, filename, save_path))
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for year, success in pool.map(lambda job: fetch(*job), jobs):
+                results[year] = success
+        
+        return dict(sorted(results.items()))
+    
+    def download_names_data(self, start_year: Optional[int] = None, end_year: Optional[int] = None,
+                            concurrency: int = 8, refresh: bool = False) -> Dict[int, bool]:
         """
         Download names ranking data (n_YYYY.json files).
         
         Args:
             start_year: Start year (default: 1912)
             end_year: End year (default: current year)
+            concurrency: Maximum number of simultaneous requests
+            refresh: Revalidate files already on disk (conditional GET)
             
         Returns:
             Dictionary mapping year to download success status
@@ -118,37 +222,23 @@ class MeijiYasudaScraper:
         
         logger.info(f"Downloading names data from {start_year} to {end_year}")
         
-        results = {}
-        successful_downloads = 0
-        
-        for year in range(start_year, end_year + 1):
-            filename = f"n_{year}.json"
-            save_path = self.output_dir / "names" / filename
-            
-            if save_path.exists():
-                logger.info(f"⚪ Skipping {filename} (already exists)")
-                results[year] = True
-                successful_downloads += 1
-                continue
-            
-            success = self.download_file(filename, save_path)
-            results[year] = success
-            
-            if success:
-                successful_downloads += 1
-            
-            time.sleep(0.5)  # Be respectful to the server
+        results = self._download_years("n", "names", start_year, end_year,
+                                       concurrency=concurrency, refresh=refresh)
+        successful_downloads = sum(results.values())
         
         logger.info(f"Names data download complete: {successful_downloads}/{len(results)} files")
         return results
     
-    def download_readings_data(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> Dict[int, bool]:
+    def download_readings_data(self, start_year: Optional[int] = None, end_year: Optional[int] = None,
+                               concurrency: int = 8, refresh: bool = False) -> Dict[int, bool]:
         """
         Download readings ranking data (y_YYYY.json files).
         
         Args:
             start_year: Start year (default: 2004)
             end_year: End year (default: current year)
+            concurrency: Maximum number of simultaneous requests
+            refresh: Revalidate files already on disk (conditional GET)
             
         Returns:
             Dictionary mapping year to download success status
@@ -158,26 +248,9 @@ class MeijiYasudaScraper:
         
         logger.info(f"Downloading readings data from {start_year} to {end_year}")
         
-        results = {}
-        successful_downloads = 0
-        
-        for year in range(start_year, end_year + 1):
-            filename = f"y_{year}.json"
-            save_path = self.output_dir / "readings" / filename
-            
-            if save_path.exists():
-                logger.info(f"⚪ Skipping {filename} (already exists)")
-                results[year] = True
-                successful_downloads += 1
-                continue
-            
-            success = self.download_file(filename, save_path)
-            results[year] = success
-            
-            if success:
-                successful_downloads += 1
-            
-            time.sleep(0.5)  # Be respectful to the server
+        results = self._download_years("y", "readings", start_year, end_year,
+                                       concurrency=concurrency, refresh=refresh)
+        successful_downloads = sum(results.values())
         
         logger.info(f"Readings data download complete: {successful_downloads}/{len(results)} files")
         return results
@@ -203,103 +276,70 @@ class MeijiYasudaScraper:
         
         return results
     
-    def process_names_file(self, year: int) -> Optional[pd.DataFrame]:
-        """Process a names JSON file into a structured DataFrame."""
+    def process_names_file(self, year: int) -> Optional[List[Dict]]:
+        """Process a names JSON file into a list of records tagged with year and type."""
         file_path = self.output_dir / "names" / f"n_{year}.json"
         
         if not file_path.exists():
             return None
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(data)
-            df['year'] = year
-            df['data_type'] = 'names'
-            
-            # Standardize column names based on JavaScript analysis
-            # Expected fields: name, yomi, rank, sex, code
-            if 'sex' in df.columns:
-                df['gender'] = df['sex'].map({'m': 'male', 'f': 'female'})
-            
-            return df
-            
-        except Exception as e:
-            logger.error(f"Error processing names file for {year}: {e}")
-            return None
+        return _parse_year_file(file_path)
     
-    def process_readings_file(self, year: int) -> Optional[pd.DataFrame]:
-        """Process a readings JSON file into a structured DataFrame."""
+    def process_readings_file(self, year: int) -> Optional[List[Dict]]:
+        """Process a readings JSON file into a list of records tagged with year and type."""
         file_path = self.output_dir / "readings" / f"y_{year}.json"
         
         if not file_path.exists():
             return None
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(data)
-            df['year'] = year
-            df['data_type'] = 'readings'
-            
-            # Standardize column names
-            if 'sex' in df.columns:
-                df['gender'] = df['sex'].map({'m': 'male', 'f': 'female'})
-            
-            return df
-            
-        except Exception as e:
-            logger.error(f"Error processing readings file for {year}: {e}")
-            return None
+        return _parse_year_file(file_path)
     
-    def create_combined_dataset(self) -> pd.DataFrame:
-        """Create a combined dataset from all downloaded files."""
+    def create_combined_dataset(self, excel: bool = False, workers: int = 1) -> pd.DataFrame:
+        """Create a combined dataset from all downloaded files.
+
+        The Excel copy is slow to write and only for viewing, so it is
+        written only if excel is True.  With workers > 1 the files are
+        parsed in that many processes.
+        """
         logger.info("Creating combined dataset")
         
-        all_data = []
-        
-        # Process names files
-        names_dir = self.output_dir / "names"
-        for file_path in names_dir.glob("n_*.json"):
-            try:
-                year = int(file_path.stem.split('_')[1])
-                df = self.process_names_file(year)
-                if df is not None:
-                    all_data.append(df)
-            except ValueError:
-                continue
-        
-        # Process readings files
-        readings_dir = self.output_dir / "readings"
-        for file_path in readings_dir.glob("y_*.json"):
-            try:
-                year = int(file_path.stem.split('_')[1])
-                df = self.process_readings_file(year)
-                if df is not None:
-                    all_data.append(df)
-            except ValueError:
-                continue
-        
-        if not all_data:
+        # names files, then readings files
+        file_paths = list((self.output_dir / "names").glob("n_*.json")) \
+            + list((self.output_dir / "readings").glob("y_*.json"))
+        
+        all_records = []
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(_parse_year_file, file_paths, chunksize=8))
+        else:
+            parsed = map(_parse_year_file, file_paths)
+        for records in parsed:
+            if records is not None:
+                all_records.extend(records)
+        
+        if not all_records:
             logger.warning("No data files found to combine")
             return pd.DataFrame()
         
-        # Combine all data
-        combined_df = pd.concat(all_data, ignore_index=True)
+        # Build the frame once from all records
+        combined_df = pd.DataFrame.from_records(all_records)
+        
+        # Standardize column names based on JavaScript analysis
+        # Expected fields: name, yomi, rank, sex, code
+        if 'sex' in combined_df.columns:
+            combined_df.insert(combined_df.columns.get_loc('data_type') + 1, 'gender',
+                               combined_df['sex'].map({'m': 'male', 'f': 'female'}))
         
         # Save combined dataset
         output_path = self.output_dir / "processed" / "combined_rankings.csv"
         combined_df.to_csv(output_path, index=False, encoding='utf-8')
         logger.info(f"Combined dataset saved to {output_path}")
         
-        # Save as Excel for easier viewing
-        excel_path = self.output_dir / "processed" / "combined_rankings.xlsx"
-        combined_df.to_excel(excel_path, index=False)
-        logger.info(f"Combined dataset saved to {excel_path}")
+        if excel:
+            # Save as Excel for easier viewing
+            excel_path = self.output_dir / "processed" / "combined_rankings.xlsx"
+            combined_df.to_excel(excel_path, index=False)
+            logger.info(f"Combined dataset saved to {excel_path}")
         
         return combined_df
     
@@ -328,8 +368,8 @@ class MeijiYasudaScraper:
         logger.info(f"Summary report saved to {summary_path}")
         return summary
     
-    def run_full_scrape(self) -> Dict:
-        """Run the complete scraping process."""
+    def run_full_scrape(self, workers: int = 1) -> Dict:
+        """Run the complete scraping process, parsing the files in workers processes."""
         logger.info("Starting full scrape of Meiji Yasuda baby names data")
         
         results = {
@@ -347,7 +387,7 @@ class MeijiYasudaScraper:
             results["additional_data"] = self.download_additional_data()
             
             # Process and combine data
-            combined_df = self.create_combined_dataset()
+            combined_df = self.create_combined_dataset(workers=workers)
             results["summary"] = self.generate_summary_report(combined_df)
             
             results["end_time"] = datetime.now().isoformat()
@@ -367,7 +407,7 @@ class MeijiYasudaScraper:
         
         return results
 
-def main():
+def main(workers: int = 1):
     """Main function to run the scraper."""
     print("Meiji Yasuda Baby Names Scraper")
     print("=" * 50)
@@ -375,7 +415,7 @@ def main():
     scraper = MeijiYasudaScraper()
     
     # Run the full scraping process
-    results = scraper.run_full_scrape()
+    results = scraper.run_full_scrape(workers=workers)
     
     if results.get("status") == "completed":
         summary = results.get("summary", {})
@@ -388,4 +428,4 @@ def main():
         print(f"\n✗ Scraping failed: {results.get('error', 'Unknown error')}")
 
 if __name__ == "__main__":
-    main()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1)
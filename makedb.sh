@@ -86,6 +86,8 @@ python calc_feat_uniq.py namae.db
 
 echo "Copy scripts/namae.db to web/db/namae.db'"
 
+# the build scripts use WAL; fold the log back in so the copy is self-contained
+sqlite3 namae.db "PRAGMA journal_mode=DELETE;"
 cp namae.db ../web/db/namae.db
 
 # index the tables
@@ -1,9 +1,9 @@
 import pandas as pd
-import sqlite3
+from openpyxl import load_workbook
 import numpy as np
 import sys, os
 
-from db import cache_years
+from db import cache_years, open_db
 
 db = "namae.db"
 
@@ -12,7 +12,7 @@ excelfile = sys.argv[1]
 
 # make the database
 
-conn = sqlite3.connect(db)    # loads dbfile as con
+conn = open_db(db)    # loads dbfile as con
 c = conn.cursor()
 with open(os.path.join(scriptdir, 'tables.sql'), 'r') as sql_file:
     sql_script = sql_file.read()
@@ -20,77 +20,47 @@ c.executescript(sql_script)
 conn.commit()
 
 # Load the xlsx file
+# read-only openpyxl streams the rows; cells become strings as with dtype='str'
+wb = load_workbook(excelfile, read_only=True, data_only=True)
 
+frames = []
 for (sheet, gender) in [(0, 'M'), (1, 'F')]:
 
-    excel_data = pd.read_excel(excelfile,
-                               sheet_name=sheet,
-                               dtype='str',
-                               header=None)
-    df = pd.DataFrame(excel_data)
-    df.fillna('', inplace=True) #
-    
-    df.columns = 'blank1 date kanji hira location gender explanation'.split()
-    for index, row in df.iterrows():
-        #print(row)
-        c.execute("""
-        INSERT INTO namae (year, orth, pron, loc, gender, explanation, src)
-        VALUES (?, ?, ?, ?, ?, ?, ?)""", (int(row['date']),
-                                       row['kanji'],
-                                       row['hira'],
-                                       row['location'],
-                                       gender,
-                                       row['explanation'],
-                                       'bc'))
-conn.commit()
+    df = pd.DataFrame([['' if v is None else str(v) for v in row]
+                       for row in wb.worksheets[sheet].iter_rows(max_col=7,
+                                                                 values_only=True)])
 
-### add bc data to nrank
-c.executescript("""
--- Insert aggregated data by orth only (pron = NULL)
-INSERT INTO nrank (year, orth, pron, rank, gender, freq, src)
-SELECT
-  year,
-  orth,
-  NULL AS pron,
-  ROW_NUMBER() OVER (PARTITION BY year, gender ORDER BY COUNT(*) DESC) AS rank,
-  gender,
-  COUNT(*) AS freq,
-  src
-FROM namae
-WHERE src = 'bc'
-GROUP BY year, orth, gender, src
-ORDER BY year, gender, COUNT(*) DESC;
+    df.columns = 'blank1 date kanji hira location gender explanation'.split()
+    frames.append(pd.DataFrame({'year': df['date'].astype(int),
+                                'orth': df['kanji'],
+                                'pron': df['hira'],
+                                'loc': df['location'],
+                                'gender': gender,
+                                'explanation': df['explanation'],
+                                'src': 'bc'}))
 
--- Insert aggregated data by pron only (orth = NULL)
-INSERT INTO nrank (year, orth, pron, rank, gender, freq, src)
-SELECT
-  year,
-  NULL AS orth,
-  pron,
-  ROW_NUMBER() OVER (PARTITION BY year, gender ORDER BY COUNT(*) DESC) AS rank,
-  gender,
-  COUNT(*) AS freq,
-  src
-FROM namae
-WHERE src = 'bc'
-GROUP BY year, pron, gender, src
-ORDER BY year, gender, COUNT(*) DESC;
+wb.close()
+names = pd.concat(frames, ignore_index=True)
 
--- Insert aggregated data by both orth and pron
-INSERT INTO nrank (year, orth, pron, rank, gender, freq, src)
-SELECT
-  year,
-  orth,
-  pron,
-  ROW_NUMBER() OVER (PARTITION BY year, gender ORDER BY COUNT(*) DESC) AS rank,
-  gender,
-  COUNT(*) AS freq,
-  src
-FROM namae
-WHERE src = 'bc'
-GROUP BY year, orth, pron, gender, src
-ORDER BY year, gender, COUNT(*) DESC;
-""")
+### add bc data to nrank
+# rank by frequency within each year and gender, three ways:
+# by orth only (pron = NULL), by pron only (orth = NULL) and by both
+ranks = []
+for keys in (['orth'], ['pron'], ['orth', 'pron']):
+    agg = names.groupby(['year', 'gender'] + keys, dropna=False) \
+               .size().reset_index(name='freq') \
+               .sort_values(['year', 'gender', 'freq'],
+                            ascending=[True, True, False], kind='stable')
+    agg['rank'] = agg.groupby(['year', 'gender']).cumcount() + 1
+    ranks.append(agg)
+nrank = pd.concat(ranks, ignore_index=True)
+nrank['src'] = 'bc'
+with conn:  # names and ranks in one transaction
+    names.to_sql('namae', conn, if_exists='append', index=False,
+                 method='multi', chunksize=1000)
+    nrank[['year', 'orth', 'pron', 'rank', 'gender', 'freq', 'src']].to_sql(
+        'nrank', conn, if_exists='append', index=False,
+        method='multi', chunksize=1000)
 
 cache_years(db, 'bc')
 
@@ -1,12 +1,13 @@
 import os
 import sys
-import sqlite3
 import regex
+import unicodedata
 import yaml
 from collections import defaultdict as dd
+from functools import lru_cache
 
 
-from db import cache_years
+from db import cache_years, open_db
 
 
 mapping = [('―', 'ー'),
@@ -28,86 +29,107 @@ mapping = [('―', 'ー'),
            # ('礼', ''),
            ]
 
+# set HEISEI_VERBOSE=1 to log every remapped, long and rejected name
+VERBOSE = os.environ.get('HEISEI_VERBOSE') == '1'
+
+# every rule maps one character to one character
+TRANS = str.maketrans(dict(mapping))
 
 with open('kanji.yaml') as fh:
     kanji = yaml.load(fh, Loader=yaml.SafeLoader)
 
 allowed=kanji['joyo'].union(kanji['jinmei']).union(kanji['iterator'])
-    
+
+# every code point with Hiragana or Katakana in its script extensions,
+# found once so that possible() is a plain set test
+KANA_RE = regex.compile(r'[\p{scx=Hiragana}\p{scx=Katakana}]')
+HIRA_KATA = frozenset(KANA_RE.findall(''.join(map(chr, range(sys.maxunicode + 1)))))
+ALLOWED_ALL = frozenset(allowed) | HIRA_KATA
+
+@lru_cache(maxsize=None)  # the same names come up year after year
 def possible(name, only_kanji=False):
     """
     True if a name is a possible Japanese first name
 
     That is, it is made up only of allowed kanji, hiragana or katakana
     """
-    for c in name:
-        if only_kanji:
-            if c not in allowed:
-                return False
-        else:
-            if c not in allowed and \
-               not regex.match(r'^[\p{scx=Hiragana}\p{scx=Katakana}]+$', c):
-                return False
-    else:
-        return True
-
-#if name != '※希望により削除':
+    return (allowed if only_kanji else ALLOWED_ALL).issuperset(name)
 
 
 def load_heisei_data(data_dir, db_path):
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     c = conn.cursor()
-    log = open("heisei.log", 'w')
-    stats =dd(int)
-    ranked = []
-    for directory, gender in [('boy', 'M'), ('girl', 'F')]:
-        dir_path = os.path.join(data_dir, directory)
-        for filename in os.listdir(dir_path):
-            if filename.endswith('.txt'):
+    # the log is closed (and flushed) even if loading fails part way
+    with open("heisei.log", 'w', buffering=1 << 20) as log:
+        stats =dd(int)
+        ranked = []
+        for directory, gender in [('boy', 'M'), ('girl', 'F')]:
+            dir_path = os.path.join(data_dir, directory)
+            # sorted, so rows are loaded in the same order on any filesystem
+            with os.scandir(dir_path) as entries:
+                files = sorted((entry.name, entry.path) for entry in entries
+                               if entry.name.endswith('.txt'))
+            for filename, path in files:
                 year = int(filename[1:3]) + 1988
-                with open(os.path.join(dir_path, filename), 'r', encoding='utf-8') as file:
+                with open(path, 'r', encoding='utf-8') as file:
                     for line in file:
                         parts = line.strip().split('\t')
                         if len(parts) == 3:
                             rank, name, frequency = int(parts[0]), parts[1], int(parts[2])
                             if rank == 0:  # one source file is 0-indexed
                                 rank = 1
-                            for (f, t) in mapping:
-                                oldname = name
-                                name = name.replace(f, t)
+                            oldname = name
+                            # NFC folds compatibility kanji (e.g. U+F929) into the usual ones
+                            name = unicodedata.normalize('NFC', name).translate(TRANS)
                             if oldname != name:
-                                print(f"REMAP: '{oldname}' - '{name}' - {directory}/{filename}",
-                                      file=log)
+                                if VERBOSE:
+                                    print(f"REMAP: '{oldname}' - '{name}' - {directory}/{filename}",
+                                          file=log)
                                 stats['remap\ttype'] += 1
                                 stats['remap\ttoken'] += frequency
                             if possible(name):
                                 if len(name) <= 4 \
                                    or not possible(name, only_kanji=True):
-                                    data= [(year, name, gender, 'hs')] * frequency
-                                    c.executemany(""" 
-                                    INSERT INTO namae (year, orth, gender, src)
-                                    VALUES (?, ?, ?, ?)""", data)
                                     ranked.append((year, name, rank, gender, frequency, 'hs'))
                                     stats['good\ttype'] += 1
                                     stats['good\ttoken'] += frequency
                                 else:
-                                    print(f"FULLNAME: '{name}' -  {frequency} - {directory}/{filename}",
-                                          file=log)
+                                    if VERBOSE:
+                                        print(f"FULLNAME: '{name}' -  {frequency} - {directory}/{filename}",
+                                              file=log)
                                     stats['long\ttype'] += 1
                                     stats['long\ttoken'] += frequency 
                             else:
-                                print(f"REJECT: '{name}' -  {frequency} - {directory}/{filename}",
-                                      file=log)
+                                if VERBOSE:
+                                    print(f"REJECT: '{name}' -  {frequency} - {directory}/{filename}",
+                                          file=log)
                                 stats['reject\ttype'] += 1
                                 stats['reject\ttoken'] += frequency
-    c.executemany("""
-    INSERT INTO nrank (year, orth, rank, gender, freq, src)
-                VALUES (?, ?, ?, ?, ?, ?)""", ranked)
-                                
-    print("\n\n## Statistics\n", file=log)
-    for s, f in stats.items():
-        print(f'{s}\t{f}', file=log)
-        
+        with conn:  # everything in one transaction, after all files are read
+            c.executemany("""
+            INSERT INTO nrank (year, orth, rank, gender, freq, src)
+                        VALUES (?, ?, ?, ?, ?, ?)""", ranked)
+            # expand each ranked name to one namae row per baby:
+            # join against the numbers 1..max(freq), kept in the order of nrank
+            c.execute("CREATE TEMP TABLE cnt (x INTEGER PRIMARY KEY)")
+            c.execute("""
+            WITH RECURSIVE seq(x) AS (
+              SELECT 1 UNION ALL SELECT x + 1 FROM seq
+              WHERE x < (SELECT MAX(freq) FROM nrank WHERE src = 'hs'))
+            INSERT INTO cnt SELECT x FROM seq""")
+            # CROSS JOIN keeps nrank as the outer loop, so no sort is needed
+            c.execute("""
+            INSERT INTO namae (year, orth, gender, src)
+            SELECT year, orth, gender, src
+            FROM nrank CROSS JOIN cnt
+            WHERE src = 'hs' AND x <= freq
+            ORDER BY nrid, x""")
+            c.execute("DROP TABLE cnt")
+
+        print("\n\n## Statistics\n", file=log)
+        for s, f in stats.items():
+            print(f'{s}\t{f}', file=log)
+
     conn.commit()
     conn.close()
 
@@ -1,10 +1,11 @@
 from jamdict import Jamdict
-import sqlite3 
 import sys, os
 #from utils import whichScript
+from utils import kata2hira
 from collections import defaultdict as dd
 import yaml
-import jaconv
+
+from db import open_db
 
 
 # Initialize Jamdict
@@ -12,7 +13,7 @@ jam = Jamdict()
 
 db = "namae.db"
 scriptdir = os.path.dirname(sys.argv[0])
-conn = sqlite3.connect(db)
+conn = open_db(db)
 c = conn.cursor()
 
 # Begin transaction
@@ -44,10 +45,9 @@ next_kid = 1  # Assuming auto-increment starts at 1, adjust if needed
 
 # Process all kanji at once
 for k in kanji:
-    result = jam.lookup(k)
-    chars = result.chars
-    if chars:
-        char = chars[0]
+    # only the Kanjidic entry is used, so skip the JMdict/JMnedict searches
+    char = jam.get_char(k)
+    if char:
         imi, on, kun, other = [], [], [], []
         for group in char.rm_groups:
             imi.extend(r.value for r in group.meanings if r.m_lang in ("en", ""))
@@ -61,7 +61,7 @@ for k in kanji:
             char.freq,
             ', '.join(imi),
             ' '.join(kun),
-            ' '.join([jaconv.kata2hira(k) for k in on]),
+            ' '.join([kata2hira(k) for k in on]),
             ', '.join(other),
             ' '.join(char.nanoris),
             char.stroke_count
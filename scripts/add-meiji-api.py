@@ -1,37 +1,36 @@
 import pandas as pd
-import sqlite3
+import csv
 import sys
-import jaconv
 
-from db import cache_years
+from db import cache_years, open_db
+from utils import kata2hira
 
-def add_meiji(database_path, data_path, total_path):
+def read_rankings(data_path):
     """
-    Add this data:
+    Yield nrank rows from the combined Meiji rankings CSV:
     year,rank,name,count,per,sex,code,data_type,gender,yomi
     1938,1.0,勝,,,m,21213,names,male,
     1938,1.0,和子,,,f,21644_23376,names,female,
     2012,1.0,,86.0,0.0254,m,12495_12523_12488,readings,male,ハルト
     2012,1.0,,60.0,0.0186,f,12518_12452,readings,female,ユイ
     """
-    data = []
-    totals = []
-    with open(data_path) as f:
-        for l in f:
-            if l.startswith('year'):
-                continue #lose header
-            year,rank,name,count,per,sex,code,data_type,gender,yomi = l.strip().split(",")
-            year = int(year)
-            rank =  int(float(rank))
-            if count:
-                count = int(float(count))
-            else:
-                count = None
-            gender = sex.upper()
-            name = name if name else None
-            yomi = jaconv.kata2hira(yomi) if yomi else None
-            data.append((year, name, yomi, rank, gender, count, 'meiji'))
+    with open(data_path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)  # lose header
+        for year,rank,name,count,per,sex,code,data_type,gender,yomi in reader:
+            yield (int(year),
+                   name if name else None,
+                   kata2hira(yomi) if yomi else None,
+                   int(float(rank)),
+                   sex.upper(),
+                   int(float(count)) if count else None,
+                   'meiji')
 
+def add_meiji(database_path, data_path, total_path):
+    """
+    Add the Meiji rankings (see read_rankings) and the yearly totals
+    """
+    totals = []
     with open(total_path) as f:
         for l in f:
             if l.startswith('Year'):
@@ -39,12 +38,11 @@ def add_meiji(database_path, data_path, total_path):
             (year, total, boy, girl) = l.strip().split("\t")
             totals.append((int(year), 'M', boy))
             totals.append((int(year), 'F', girl))
-    #print("DATA:", data[:10])
-    conn = sqlite3.connect(database_path)
+    conn = open_db(database_path)
     c = conn.cursor()
     c.executemany(""" 
     INSERT INTO nrank (year, orth, pron, rank, gender, freq, src)
-    VALUES (?, ?, ?, ?, ?, ?, ?)""", data)
+    VALUES (?, ?, ?, ?, ?, ?, ?)""", read_rankings(data_path))
     ### save the totals (to be loaded with the years)
     c.executemany("""
     INSERT INTO name_year_cache (src, dtype, year, gender, count)
@@ -57,7 +55,7 @@ def add_missing(excel_path, db_path):
     """
     for some reason 2013 is missing counts from the api data for orth only
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     c = conn.cursor()
     excel_data = pd.read_excel(excel_path,
                                sheet_name='2013',
@@ -66,33 +64,31 @@ def add_missing(excel_path, db_path):
     df = pd.DataFrame(excel_data)
     df.fillna('', inplace=True) #
     df.columns = 'male mcount _ _ _ female fcount'.split()
-    for index, row in df.iterrows():
-        #print (index, row['male'], row['mcount'])
-        if row['male'] and row['mcount']:
-                # year, orth, pron, loc, gender, explanation, src
+    # (orth, gender) -> freq; a later row overrides an earlier one
+    fixes = {}
+    for male, mcount, female, fcount in df[['male', 'mcount', 'female', 'fcount']] \
+            .itertuples(index=False, name=None):
+        if male and mcount:
             try:
-                 c.execute(""" 
-                 UPDATE nrank set freq= ?
-                 WHERE year = 2013 
-                   AND orth = ?
-                   AND gender = 'M'
-                   AND src = 'meiji'""",
-                           ((int(row['mcount']),
-                             row['male'].strip())))
-            except:
-                print('ERROR', 'M', row['male'], row['mcount'])
-        if row['female'] and row['fcount']:
+                fixes[(male.strip(), 'M')] = int(mcount)
+            except ValueError:
+                print('ERROR', 'M', male, mcount)
+        if female and fcount:
             try:
-             c.execute(""" 
-                 UPDATE nrank set freq= ?
-                 WHERE year = 2013 
-                   AND orth = ?
-                   AND gender = 'F'
-                   AND src = 'meiji'""",
-                           ((int(row['fcount']),
-                             row['female'].strip())))
-            except:
-                print('ERROR', 'F', row['female'], row['fcount'])
+                fixes[(female.strip(), 'F')] = int(fcount)
+            except ValueError:
+                print('ERROR', 'F', female, fcount)
+    c.execute("CREATE TEMP TABLE fix2013 (orth TEXT, gender TEXT, freq INTEGER)")
+    c.executemany("INSERT INTO fix2013 (orth, gender, freq) VALUES (?, ?, ?)",
+                  [(orth, gender, freq) for (orth, gender), freq in fixes.items()])
+    c.execute("""
+    UPDATE nrank SET freq = fix2013.freq
+    FROM fix2013
+    WHERE nrank.year = 2013
+      AND nrank.orth = fix2013.orth
+      AND nrank.gender = fix2013.gender
+      AND nrank.src = 'meiji'""")
+    c.execute("DROP TABLE fix2013")
 
     conn.commit()
     conn.close()
@@ -101,19 +97,25 @@ def update_namae (db_path, src):
     """
     add the names to meiji
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     c = conn.cursor()
     c.execute("""SELECT year, orth, pron, gender, freq
     FROM nrank
     WHERE src='meiji'
     AND freq IS NOT NULL""")
-    names = []
-    for (year, orth, pron, gender, freq) in c:
-        names += [[year, orth, pron, gender]] * freq
+    ranked = c.fetchall()
+
+    def names():
+        """one row per baby, generated as executemany consumes them"""
+        for (year, orth, pron, gender, freq) in ranked:
+            row = (year, orth, pron, gender)
+            for _ in range(freq):
+                yield row
+
     c.executemany("""
     INSERT INTO namae (year, orth, pron, gender, src)
     VALUES (?, ?, ?, ?, 'meiji')""",
-                  names)              
+                  names())
     conn.commit()
     conn.close()
 
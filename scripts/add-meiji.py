@@ -1,12 +1,16 @@
 import pandas as pd
-import sqlite3
 import sys
 import re
 
+from db import open_db
+
+
+# full-width digits to half-width; drop commas, spaces and colons
+NORMALIZE = str.maketrans('０１２３４５６７８９', '0123456789', ',， ：')
 
 def normalize(s):
     # Convert full-width numbers to half-width, remove commas/whitespace
-    return s.translate(str.maketrans('０１２３４５６７８９', '0123456789')).replace(",", "").replace("，", "").replace(" ", "").replace("：", "")
+    return s.translate(NORMALIZE)
 
 pattern = re.compile(r'男の子(\d+)人、女の子(\d+)人')
 
@@ -15,46 +19,45 @@ def load_meiji_data(excel_path, db_path):
     """
     Load the data from Meiji Yasuda
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     c = conn.cursor()
     data = []
     # from https://osf.io/za6x7/files/osfstorage
     # https://doi.org/10.17605/OSF.IO/ZA6X7
     totals = [(2004, 'M', 4861), (2004, 'F', 4419), (2005, 'M', 4292), (2005, 'F', 4082) ]
+    # open the workbook once and parse each year's sheet from it
+    xl = pd.ExcelFile(excel_path)
     for year in range(2006,2023):
-        excel_data = pd.read_excel(excel_path,
-                                   sheet_name=str(year),
-                                   dtype='str',
-                                   header=None)
-        df = pd.DataFrame(excel_data)
+        df = xl.parse(sheet_name=str(year),
+                      dtype='str',
+                      header=None)
         df.fillna('', inplace=True) #
         df.columns = 'male mcount _ _ _ female fcount'.split()
-        for index, row in df.iterrows():
-            #print (row)
-            if row['male'].startswith('男の子'):
-                # total frequencies
-                clean = normalize(row['male'])
-                #print (year,  normalize(row['male']))
-                match = pattern.search(clean)
-                if match:
-                    boy = int(match.group(1))
-                    girl = int(match.group(2))
-                    totals.append((year, 'M', boy))
-                    totals.append((year, 'F', girl))
-            if row['male'] and row['mcount']:
+        # total frequencies
+        for total in df.loc[df['male'].str.startswith('男の子'), 'male']:
+            match = pattern.search(normalize(total))
+            if match:
+                boy = int(match.group(1))
+                girl = int(match.group(2))
+                totals.append((year, 'M', boy))
+                totals.append((year, 'F', girl))
+        # plain tuples rather than iterrows(), which boxes every row in a Series
+        for male, mcount, female, fcount in df[['male', 'mcount', 'female', 'fcount']] \
+                .itertuples(index=False, name=None):
+            if male and mcount:
                 # year, orth, pron, loc, gender, explanation, src
                 try:
-                    for i in range(int(row['mcount'])):
-                        data.append((year, row['male'].strip(), 'M', 'meiji'))
+                    data.extend([(year, male.strip(), 'M', 'meiji')]
+                                * int(mcount))
                 except:
-                    print('ERROR', year, row['male'], row['mcount'])
-            if row['female'] and row['fcount']:
+                    print('ERROR', year, male, mcount)
+            if female and fcount:
                 try:
                 # year, orth, pron, loc, gender, explanation, src
-                    for i in range(int(row['fcount'])):
-                        data.append((year, row['female'].strip(), 'F', 'meiji'))
+                    data.extend([(year, female.strip(), 'F', 'meiji')]
+                                * int(fcount))
                 except:
-                    print('ERROR', year, row['female'], row['fcount'])
+                    print('ERROR', year, female, fcount)
     #print (data[::1000])
     #print(totals)
     c.executemany(""" 
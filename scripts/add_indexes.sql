@@ -3,6 +3,10 @@
 CREATE INDEX IF NOT EXISTS idx_namae_src_year_gender ON namae(src, year, gender);
 CREATE INDEX IF NOT EXISTS idx_namae_src_orth        ON namae(src, orth);
 CREATE INDEX IF NOT EXISTS idx_namae_src_pron        ON namae(src, pron);
+-- covers calc_regular's GROUP BY orth, pron, year, gender and its namae × mapp
+-- count; partial, as most Heisei rows have no pron and never reach them
+CREATE INDEX IF NOT EXISTS idx_namae_orth_pron_year_gender ON namae(orth, pron, year, gender)
+       WHERE orth IS NOT NULL AND pron IS NOT NULL;
 
 -- Indexes for nrank (1.5M rows — the most heavily queried table, currently
 -- has no indexes at all)
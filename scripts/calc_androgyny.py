@@ -2,24 +2,26 @@
 ###  Pre-compute androgyny data for all source/dtype/tau/count_type combos.
 ###  Saves results to web/static/data/androgyny_data.json
 ###
+###  usage: python calc_androgyny.py [workers]
+###  (defaults to one worker per CPU; each has its own read-only connection)
+###
 
-import sys, os, json, sqlite3
+import os, json
 
 # Use the symlinked db module (avoids importing Flask via web/__init__.py)
 from db import db_options, resolve_src, get_androgyny
+import precompute
+from precompute import computed, skip, workers_arg
 
-DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
 OUT_PATH = os.path.join('..', 'web', 'static', 'data', 'androgyny_data.json')
 
 tau_values = [0.0, 0.2]
 count_types = ['token', 'type']
 
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    all_data = {}
+def combos():
+    """(key, src, dtype, count_type, tau) for every combo to compute."""
     seen = set()
-
     for src in db_options:
         qsrc = resolve_src(src)
         opt_dtypes = db_options[src][2]
@@ -36,34 +38,46 @@ def main():
             for count_type in count_types:
                 for tau in tau_values:
                     key = f"{qsrc}_{dtype}_{count_type}_tau{int(tau*10)}"
-                    try:
-                        data, regression = get_androgyny(
-                            conn, src=qsrc, dtype=dtype,
-                            tau=tau, count_type=count_type)
-                    except Exception as e:
-                        print(f"  SKIP {key}: {e}", file=sys.stderr)
-                        continue
-
-                    if not data:
-                        continue
-
-                    all_data[key] = {
-                        'data': data,
-                        'regression': regression,
-                        'src': qsrc,
-                        'dtype': dtype,
-                        'count_type': count_type,
-                        'tau': tau,
-                    }
-                    print(f"  {key}: {len(data)} years")
-
-    conn.close()
+                    yield key, qsrc, dtype, count_type, tau
+
+
+def compute(combo):
+    key, qsrc, dtype, count_type, tau = combo
+    try:
+        data, regression = get_androgyny(
+            precompute.conn, src=qsrc, dtype=dtype,
+            tau=tau, count_type=count_type)
+    except Exception as e:
+        return key, skip(key, e)
+
+    if not data:
+        return key, None
+
+    return key, {
+        'data': data,
+        'regression': regression,
+        'src': qsrc,
+        'dtype': dtype,
+        'count_type': count_type,
+        'tau': tau,
+    }
+
+
+def main(workers):
+    all_data = {}
+
+    with computed(compute, combos(), workers) as results:
+        for key, entry in results:
+            if entry is None:
+                continue
+            all_data[key] = entry
+            print(f"  {key}: {len(entry['data'])} years")
 
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
     with open(OUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=1)
+        json.dump(all_data, f, ensure_ascii=False, separators=(',', ':'))
     print(f"Wrote {OUT_PATH} ({len(all_data)} datasets)")
 
 
 if __name__ == '__main__':
-    main()
+    main(workers_arg())
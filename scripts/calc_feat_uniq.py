@@ -2,18 +2,26 @@
 ###  Calculate features but only once for each type
 ###
 
-import sqlite3
 import argparse
+from db import open_db
 from utils import whichScript, mora_hiragana, syllable_hiragana
 from calc_regular import KanjiReadingAnalyzer
 
 
+def make_uniq(conn):
+    """
+    Scan namae once for the distinct (orth, pron) pairs;
+    the calc_* passes below read this small table instead of namae
+    """
+    conn.execute("""CREATE TEMP TABLE uniq_np AS
+                    SELECT DISTINCT orth, pron FROM namae""")
+
 ###
 ### Orthography
 ###
 def calc_orth(conn):
     c = conn.cursor()
-    c.execute("""SELECT DISTINCT orth FROM namae
+    c.execute("""SELECT DISTINCT orth FROM uniq_np
                  WHERE orth IS NOT NULL""")
 
     data = []
@@ -29,7 +37,7 @@ def calc_orth(conn):
 ###
 def calc_pron(conn):
     c = conn.cursor()
-    c.execute("""SELECT DISTINCT pron FROM namae
+    c.execute("""SELECT DISTINCT pron FROM uniq_np
                  WHERE pron IS NOT NULL""")
     data = []
     for (pron, ) in c:
@@ -49,10 +57,10 @@ def calc_pron(conn):
 def calc_mapp(conn):
     c = conn.cursor()
      
-    c.execute("""SELECT DISTINCT orth, pron FROM namae
+    c.execute("""SELECT orth, pron FROM uniq_np
                  WHERE orth IS NOT NULL AND pron IS NOT NULL""")
     analyzer = KanjiReadingAnalyzer()
-    analyzer.load_kanjidic()
+    analyzer.load_kanjidic(conn=conn)
     data = []
     for (orth, pron) in c:
         result = analyzer.analyze_name_reading(orth, pron)
@@ -71,7 +79,8 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     #scriptdir = os.path.dirname(sys.argv[0])
-    conn = sqlite3.connect(args.database)
+    conn = open_db(args.database)
+    make_uniq(conn)
     calc_orth(conn)
     calc_pron(conn)
     calc_mapp(conn)
@@ -6,11 +6,16 @@
 ###  JOINs + fisher_exact on every category.  For Heisei char1, this takes
 ###  ~143s.  Pre-computing reduces it to a JSON read.
 ###
+###  usage: python calc_features_json.py [workers]
+###  (defaults to one worker per CPU; each has its own read-only connection)
+###
 
-import sys, os, json, sqlite3
+import os, json, shutil
 import numpy as np
 
 from db import db_options, resolve_src, get_feature
+import precompute
+from precompute import computed, skip, workers_arg
 
 
 class NumpyEncoder(json.JSONEncoder):
@@ -26,22 +31,61 @@ class NumpyEncoder(json.JSONEncoder):
         return super().default(obj)
 from settings import features, overall
 
-DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
 OUT_PATH = os.path.join('..', 'web', 'static', 'data', 'features_data.json')
+# one file per combo, so progress is saved without rewriting OUT_PATH each time;
+# kept out of web/ (which is deployed) and removed once OUT_PATH is written
+OUT_DIR = os.path.join('output', 'features')
+OLD_DIR = os.path.join('..', 'web', 'static', 'data', 'features')
 
 threshold = 2  # same as routes.py
 
 
+def compute(combo):
+    key, group_name, feat1, feat2, name, src_key = combo
+    table = db_options[src_key][0]
+    qsrc = resolve_src(src_key)
+
+    try:
+        data, tests, summ = get_feature(
+            precompute.conn, feat1, feat2, threshold,
+            short=False, table=table, src=qsrc)
+    except Exception as e:
+        return key, skip(key, e)
+
+    # Convert tests: each is (key, M, F, ratio, stat, pval, sig, examples_tuple)
+    # examples_tuple contains (orth, pron) pairs — convert to lists
+    tests_out = []
+    for t in tests:
+        tests_out.append(list(t[:7]) + [list(list(x) for x in t[7])])
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
+    return key, {
+        'data': [list(d) for d in data],
+        'tests': tests_out,
+        'summ': summ,
+        'name': name,
+        'group': group_name,
+    }
+
+
+def main(workers):
+    # Remove the sidecars earlier versions left under web/
+    if os.path.isdir(OLD_DIR):
+        shutil.rmtree(OLD_DIR)
+        print(f"Removed old {OLD_DIR}")
 
     # Load existing data to allow incremental updates
     all_data = {}
     if os.path.exists(OUT_PATH):
         with open(OUT_PATH, 'r', encoding='utf-8') as f:
             all_data = json.load(f)
-
+    if os.path.isdir(OUT_DIR):
+        for fname in sorted(os.listdir(OUT_DIR)):
+            if fname.endswith('.json'):
+                with open(os.path.join(OUT_DIR, fname), 'r', encoding='utf-8') as f:
+                    all_data[fname[:-len('.json')]] = json.load(f)
+    os.makedirs(OUT_DIR, exist_ok=True)
+
+    todo = []
     for group_name, group in [('features', features), ('overall', overall)]:
         for feat1, feat2, name, possible in group:
             for src_key in possible:
@@ -49,43 +93,30 @@ def main():
                 if key in all_data:
                     print(f"  {key}: already computed, skipping")
                     continue
-
-                table = db_options[src_key][0]
-                qsrc = resolve_src(src_key)
-
-                print(f"  {key} ({name})...", end=' ', flush=True)
-
-                try:
-                    data, tests, summ = get_feature(
-                        conn, feat1, feat2, threshold,
-                        short=False, table=table, src=qsrc)
-                except Exception as e:
-                    print(f"SKIP: {e}", file=sys.stderr, flush=True)
-                    continue
-
-                # Convert tests: each is (key, M, F, ratio, stat, pval, sig, examples_tuple)
-                # examples_tuple contains (orth, pron) pairs — convert to lists
-                tests_out = []
-                for t in tests:
-                    tests_out.append(list(t[:7]) + [list(list(x) for x in t[7])])
-
-                all_data[key] = {
-                    'data': [list(d) for d in data],
-                    'tests': tests_out,
-                    'summ': summ,
-                    'name': name,
-                    'group': group_name,
-                }
-                print(f"{len(data)} categories, {len(tests)} tests", flush=True)
-
-                # Write after each combo to save progress
-                os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-                with open(OUT_PATH, 'w', encoding='utf-8') as f:
-                    json.dump(all_data, f, ensure_ascii=False, indent=1, cls=NumpyEncoder)
-
-    conn.close()
+                todo.append((key, group_name, feat1, feat2, name, src_key))
+
+    with computed(compute, todo, workers) as results:
+        for key, entry in results:
+            if entry is None:
+                continue
+            all_data[key] = entry
+            print(f"  {key} ({entry['name']}): {len(entry['data'])} categories, "
+                  f"{len(entry['tests'])} tests", flush=True)
+
+            # Write after each combo to save progress
+            with open(os.path.join(OUT_DIR, f"{key}.json"), 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, separators=(',', ':'), cls=NumpyEncoder)
+
+    with open(OUT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(all_data, f, ensure_ascii=False, separators=(',', ':'), cls=NumpyEncoder)
+
+    # Everything is in OUT_PATH now, so deleting it (after rebuilding the
+    # database) forces a full recompute rather than reusing stale combos
+    for fname in os.listdir(OUT_DIR):
+        if fname.endswith('.json'):
+            os.remove(os.path.join(OUT_DIR, fname))
     print(f"Done: {OUT_PATH} ({len(all_data)} datasets)")
 
 
 if __name__ == '__main__':
-    main()
+    main(workers_arg())
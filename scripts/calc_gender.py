@@ -5,46 +5,127 @@
 import sys, os, argparse
 import sqlite3
 from collections import defaultdict as dd
+from array import array
 
 from scipy.sparse import lil_matrix, csr_matrix
 import scipy.sparse as sp
 from scipy.stats import linregress
+from scipy.special import logsumexp
 import numpy as np
 # import pandas as pd   # <- no longer needed
-from sklearn.feature_extraction import DictVectorizer
-from sklearn.preprocessing import LabelEncoder
-from sklearn.naive_bayes import BernoulliNB
+import joblib
 
 import json
 
-from db import get_name_features
+from db import iter_name_features
 
 
-def show_row_info(X, y, vec, label_encoder, years, genders, idx, clf=None, max_feats=25):
+def vectorize(feature_dicts):
+    """
+    Build a sparse binary matrix from feature dicts in one pass.
+
+    Column names follow DictVectorizer: 'name=value' for string values,
+    plain 'name' for numeric ones (present if non-zero).
+    Returns (X, feature_names).
+    """
+    vocab = {}
+    indices = array('i')
+    indptr = array('q', [0])
+    for d in feature_dicts:
+        for k, v in d.items():
+            if isinstance(v, str):
+                k = f"{k}={v}"
+            elif not v:
+                continue
+            indices.append(vocab.setdefault(k, len(vocab)))
+        indptr.append(len(indices))
+
+    X = csr_matrix((np.ones(len(indices), dtype=np.bool_),
+                    np.frombuffer(indices, dtype=np.int32),
+                    np.frombuffer(indptr, dtype=np.int64)),
+                   shape=(len(indptr) - 1, len(vocab)))
+    return X, np.array(list(vocab))
+
+
+def fit_bernoulli_nb(X, y, n_classes, alpha=1.0, sample_weight=None):
+    """
+    Fit a Bernoulli Naive Bayes model (as sklearn's BernoulliNB) on binary X,
+    each row counting sample_weight times (default once).
+
+    Returns (w, b) such that X @ w + b is the joint log-likelihood of
+    each row under each class, so scoring stays a sparse matmul and
+    never builds the dense 1 - X.  w and b are float32, which is plenty
+    for log-probabilities and halves the traffic of the scoring matmul.
+    """
+    n_rows = X.shape[0]
+    if sample_weight is None:
+        sample_weight = np.ones(n_rows)
+    n = sample_weight.sum()
+    # (weighted) one-hot labels: Y.T @ X counts each feature per class
+    # (float64, so counts stay exact past float32's 2**24)
+    Y = csr_matrix((np.asarray(sample_weight, dtype=np.float64),
+                    (np.arange(n_rows), y)),
+                   shape=(n_rows, n_classes))
+    feat_count = (Y.T @ X.astype(np.float64)).toarray()
+    class_count = np.bincount(y, weights=sample_weight, minlength=n_classes)
+
+    # Laplace-smoothed p(feature present | class)
+    p1 = (feat_count + alpha) / (class_count[:, None] + 2 * alpha)
+    log_p1 = np.log(p1)
+    log_p0 = np.log1p(-p1)
+
+    w = log_p1 - log_p0
+    b = log_p0.sum(axis=1) + np.log(class_count / n)
+    # w is (features, classes) and C-ordered, as the CSR x dense product wants
+    return (np.ascontiguousarray(w.T, dtype=np.float32),
+            b.astype(np.float32))
+
+
+def predict_proba_nb(X, w, b):
+    """
+    Class probabilities for each row of X under the model from fit_bernoulli_nb
+    """
+    jll = X.astype(np.float32) @ w + b
+    jll -= jll.max(axis=1, keepdims=True)
+    probs = np.exp(jll)
+    probs /= probs.sum(axis=1, keepdims=True)
+    return probs
+
+
+def p_other_nb(X, y, w, b):
+    """
+    Probability the model gives to any class other than the true one (y),
+    for each row of X, straight from the log-likelihoods:
+    1 - exp(jll[y] - logsumexp(jll)), without building the probabilities
+    """
+    jll = X.astype(np.float32) @ w + b
+    log_p_true = jll[np.arange(jll.shape[0]), y] - logsumexp(jll, axis=1)
+    return -np.expm1(log_p_true)
+
+
+def show_row_info(X, y, feature_names, gender_labels, years, idx, proba=None, max_feats=25):
     """
     Display info for row `idx`:
       - year
-      - true label (and predicted label + probabilities if clf is given)
+      - true label (and predicted label + probabilities if proba, the
+        row's class probabilities, is given)
       - active (non-zero) features with their values (truncated to max_feats)
     """
     # --- metadata ---
     year = years[idx]
-    true_label = label_encoder.inverse_transform([y[idx]])[0]
+    true_label = gender_labels[y[idx]]
 
     # --- active features ---
-    feature_names = np.array(vec.get_feature_names_out())
     row = X.getrow(idx)
     active_pairs = [(feature_names[j], row.data[k]) for k, j in enumerate(row.indices)]
 
     # --- prediction (optional) ---
     pred_label = None
     proba_str = ""
-    if clf is not None:
-        pred = clf.predict(X[idx])
-        pred_label = label_encoder.inverse_transform(pred)[0]
-        proba = clf.predict_proba(X[idx])[0]
+    if proba is not None:
+        pred_label = gender_labels[np.argmax(proba)]
         proba_str = " | " + " ".join(
-            [f"p({cls})={p:.3f}" for cls, p in zip(label_encoder.classes_, proba)]
+            [f"p({cls})={p:.3f}" for cls, p in zip(gender_labels, proba)]
         )
 
     # --- print nicely ---
@@ -61,56 +142,88 @@ def show_row_info(X, y, vec, label_encoder, years, genders, idx, clf=None, max_f
     if len(active_pairs) > max_feats:
         print(f"  ... (+{len(active_pairs)-max_feats} more)")
 
-def run_experiment(conn, src, dtype, features, verbose=True, chunk_size=50000):
+def load_features(conn, src, dtype, features, db_stamp=None):
     """
-    Run an experiment, and return the results as a table.
+    Stream the names from the database straight into the sparse matrix,
+    keeping only years and genders alongside, in compact arrays.
+
+    Names with the same year, gender and features share one row:
+    many names do, so this is usually far smaller than one row per name.
+    Returns (X, feature_names, years, gender_labels, y, counts):
+    gender_labels sorted, y each row's index into them, years as int16
+    and counts the number of names for each row.
 
-    This version avoids pandas and large intermediate DataFrames:
-      - compresses name_data -> years (np.array), genders (np.array)
-      - deletes feature_dicts once X is built
-      - aggregates probabilities in dicts by (gender, year)
+    db_stamp is not used here: it identifies the database version when
+    this is wrapped in a joblib cache (see --cache).
     """
-    print(f"⛃ Getting the features for {src} ({dtype}):", features)
+    years = array('h')
+    codes = {}            # gender -> code, in order of appearance
+    gender_codes = array('b')
+    rows = {}             # (year, gender, features) -> row
+    counts = array('q')
+
+    def feature_dicts():
+        """the distinct feature dicts, counting the names for each as we go"""
+        for _orth, _pron, gender, year, feats in iter_name_features(
+                conn, features, src=src, dtype=dtype):
+            key = (year, gender, frozenset(feats.items()))
+            row = rows.get(key)
+            if row is not None:
+                counts[row] += 1
+                continue
+            rows[key] = len(counts)
+            counts.append(1)
+            years.append(year)
+            gender_codes.append(codes.setdefault(gender, len(codes)))
+            yield feats
 
-    # name_data is typically: [{'orth':..., 'pron':..., 'year':..., 'gender':..., 'features': {...}}, ...]
-    name_data, feature_vocab = get_name_features(conn, features, src=src, dtype=dtype)
+    # Sparse binary features are enough
+    X, feature_names = vectorize(feature_dicts())
+    del rows
 
-    print("🔢 Vectorizing")
+    # renumber the codes to follow the sorted labels
+    gender_labels = np.array(sorted(codes))
+    recode = np.array([gender_labels.searchsorted(g) for g in codes], dtype=np.intp)
+    y = recode[np.frombuffer(gender_codes, dtype=np.int8)]
 
-    # Extract only what we really need from name_data
-    feature_dicts = [d['features'] for d in name_data]
-    years = np.array([d['year'] for d in name_data], dtype=float)
-    genders = np.array([d['gender'] for d in name_data])
+    return (X, feature_names, np.frombuffer(years, dtype=np.int16),
+            gender_labels, y, np.frombuffer(counts, dtype=np.int64))
 
-    # We don't need orth/pron/etc. any more
-    del name_data
 
-    label_encoder = LabelEncoder()
-    y = label_encoder.fit_transform(genders)
+def run_experiment(conn, src, dtype, features, verbose=True,
+                   load=load_features, db_stamp=None):
+    """
+    Run an experiment, and return the results as a table.
 
-    # Sparse binary features are enough
-    vec = DictVectorizer(sparse=True, dtype=np.bool_)
-    X = vec.fit_transform(feature_dicts)
+    This version avoids pandas and large intermediate lists:
+      - builds the sparse matrix as the names are read (load_features,
+        or a cached wrapper of it passed as load)
+      - aggregates probabilities by (gender, year) with np.bincount
+    """
+    print(f"⛃ Getting the features for {src} ({dtype}):", features)
+    print("🔢 Vectorizing (as the names are read)")
 
-    # Drop feature_dicts as soon as X is built
-    del feature_dicts
+    X, feature_names, years, gender_labels, y, counts = load(
+        conn, src, dtype, tuple(features), db_stamp=db_stamp)
 
     if verbose:
-        print(f"Data shape: {X.shape}")
+        print(f"Data shape: {X.shape} (distinct rows for {counts.sum()} names)")
         print(f"Features: {features}")
-        print(f"Gender labels: {label_encoder.classes_}")
-        print("Feature names (first 10):", vec.get_feature_names_out()[:10])
+        print(f"Gender labels: {gender_labels}")
+        print("Feature names (first 10):", feature_names[:10])
         # Example: Look at a specific row (if available)
         if X.shape[0] > 42:
             idx = 42
         else:
             idx = 0
-        show_row_info(X, y, vec, label_encoder, years, genders, idx, clf=None)
+        show_row_info(X, y, feature_names, gender_labels, years, idx)
 
     print("🎓 Training Classifier")
 
-    clf = BernoulliNB(alpha=1.0)
-    clf.fit(X, y)
+    w, b = fit_bernoulli_nb(X, y, len(gender_labels), alpha=1.0,
+                            sample_weight=counts)
+    # only the probability of not the true gender is needed below
+    p_other = p_other_nb(X, y, w, b)
 
     if verbose:
         # Show same row with prediction
@@ -118,39 +231,24 @@ def run_experiment(conn, src, dtype, features, verbose=True, chunk_size=50000):
             idx = 42
         else:
             idx = 0
-        show_row_info(X, y, vec, label_encoder, years, genders, idx, clf=clf)
+        show_row_info(X, y, feature_names, gender_labels, years, idx,
+                      proba=predict_proba_nb(X[idx], w, b)[0])
 
     print("📊 Analyzing results (streaming, no DataFrame)")
 
-    gender_labels = label_encoder.classes_
-    label_to_idx = {lab: i for i, lab in enumerate(gender_labels)}
-
-    # Aggregators: for each gender, for each year
-    from collections import defaultdict
-    sum_p_other = {g: defaultdict(float) for g in gender_labels}
-    count = {g: defaultdict(int) for g in gender_labels}
-
-    n_rows = X.shape[0]
-
-    for start in range(0, n_rows, chunk_size):
-        end = min(n_rows, start + chunk_size)
-        X_chunk = X[start:end]
-        probs_chunk = clf.predict_proba(X_chunk)
-
-        # Iterate over rows in this chunk
-        for offset, row_idx in enumerate(range(start, end)):
-            year = years[row_idx]
-            g = genders[row_idx]
-            g_idx = label_to_idx[g]
-
-            p_correct = probs_chunk[offset, g_idx]
-            p_other = 1.0 - p_correct
-
-            sum_p_other[g][year] += p_other
-            count[g][year] += 1
+    # Aggregate p(other gender) by (gender, year) in one pass:
+    # y is already the gender index, so key each row by y * n_years + year
+    unique_years, year_idx = np.unique(years, return_inverse=True)
+    n_years = len(unique_years)
+    key = y * n_years + year_idx
+    n_keys = len(gender_labels) * n_years
+    sum_p_other = np.bincount(key, weights=p_other * counts,
+                              minlength=n_keys).reshape(-1, n_years)
+    count = np.bincount(key, weights=counts,
+                        minlength=n_keys).reshape(-1, n_years)
 
     # We can now drop X, y, etc. if we like
-    del X, y, vec, clf
+    del X, y, counts, feature_names, w, b, p_other, key, year_idx
     import gc
     gc.collect()
 
@@ -162,16 +260,12 @@ def run_experiment(conn, src, dtype, features, verbose=True, chunk_size=50000):
         'trends': {g: {} for g in gender_labels},
     }
 
-    for g in gender_labels:
-        years_sorted = sorted(sum_p_other[g].keys())
-        xs = []
-        ys = []
-
-        for year in years_sorted:
-            mean = sum_p_other[g][year] / count[g][year]
-            table['rows'].append([year, g, mean])
-            xs.append(float(year))
-            ys.append(mean)
+    for g_idx, g in enumerate(gender_labels):
+        seen = count[g_idx] > 0
+        xs = unique_years[seen].astype(float)
+        ys = sum_p_other[g_idx, seen] / count[g_idx, seen]
+        table['rows'].extend([year, g, mean]
+                             for year, mean in zip(xs.tolist(), ys.tolist()))
 
         if len(xs) >= 2:
             res = linregress(xs, ys)
@@ -181,7 +275,7 @@ def run_experiment(conn, src, dtype, features, verbose=True, chunk_size=50000):
             table['trends'][g]['pvalue'] = res.pvalue
         elif len(xs) == 1:
             table['trends'][g]['slope'] = 0.0
-            table['trends'][g]['intercept'] = ys[0]
+            table['trends'][g]['intercept'] = float(ys[0])
             table['trends'][g]['r2'] = 0.0
             table['trends'][g]['pvalue'] = 1.0
         else:
@@ -191,7 +285,7 @@ def run_experiment(conn, src, dtype, features, verbose=True, chunk_size=50000):
             table['trends'][g]['pvalue'] = 1.0
 
     # Also free these
-    del years, genders, sum_p_other, count
+    del years, unique_years, sum_p_other, count
     gc.collect()
 
     return table
@@ -230,10 +324,10 @@ if __name__ == "__main__":
     )
 
     parser.add_argument(
-        "--chunk-size",
-        type=int,
-        default=50000,
-        help="Chunk size for predict_proba calls."
+        "--cache",
+        metavar="DIR",
+        help="Cache the feature matrices in DIR (joblib), "
+             "so re-runs on an unchanged database skip the query."
     )
 
     args = parser.parse_args()
@@ -241,6 +335,14 @@ if __name__ == "__main__":
     db_path = args.db_path
     data_path = args.data_path
 
+    load = load_features
+    db_stamp = None
+    if args.cache:
+        memory = joblib.Memory(args.cache, mmap_mode='r', verbose=0)
+        load = memory.cache(load_features, ignore=['conn'])
+        st = os.stat(db_path)
+        db_stamp = (os.path.abspath(db_path), st.st_size, st.st_mtime_ns)
+
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
@@ -260,7 +362,7 @@ if __name__ == "__main__":
         table = run_experiment(
             conn, src, dtype, feats,
             verbose=not args.no_verbose,
-            chunk_size=args.chunk_size,
+            load=load, db_stamp=db_stamp,
         )
 
         key = '_'.join([src, dtype] + feats)
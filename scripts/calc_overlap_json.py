@@ -2,12 +2,16 @@
 ###  Pre-compute overlap data for all source/dtype/n_top combos.
 ###  Saves results to web/static/data/overlap_data.json
 ###
+###  usage: python calc_overlap_json.py [workers]
+###  (defaults to one worker per CPU; each has its own read-only connection)
+###
 
-import sys, os, json, sqlite3
+import os, json
 
 from db import db_options, resolve_src, get_overlap
+import precompute
+from precompute import computed, skip, workers_arg
 
-DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
 OUT_PATH = os.path.join('..', 'web', 'static', 'data', 'overlap_data.json')
 
 # Per-source n_top values (must match routes.py)
@@ -19,11 +23,9 @@ source_n_tops = {
 }
 
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    all_data = {}
+def combos():
+    """(key, src, dtype, n_top) for every combo to compute."""
     seen = set()
-
     for src in db_options:
         qsrc = resolve_src(src)
         opt_dtypes = db_options[src][2]
@@ -39,34 +41,45 @@ def main():
                 if key in seen:
                     continue
                 seen.add(key)
+                yield key, qsrc, dtype, n_top
 
-                try:
-                    data, reg_count, reg_proportion = get_overlap(
-                        conn, src=qsrc, dtype=dtype, n_top=n_top)
-                except Exception as e:
-                    print(f"  SKIP {key}: {e}", file=sys.stderr)
-                    continue
 
-                if not data:
-                    continue
+def compute(combo):
+    key, qsrc, dtype, n_top = combo
+    try:
+        data, reg_count, reg_proportion = get_overlap(
+            precompute.conn, src=qsrc, dtype=dtype, n_top=n_top)
+    except Exception as e:
+        return key, skip(key, e)
 
-                all_data[key] = {
-                    'data': data,
-                    'reg_count': reg_count,
-                    'reg_proportion': reg_proportion,
-                    'src': qsrc,
-                    'dtype': dtype,
-                    'n_top': n_top,
-                }
-                print(f"  {key}: {len(data)} years")
+    if not data:
+        return key, None
 
-    conn.close()
+    return key, {
+        'data': data,
+        'reg_count': reg_count,
+        'reg_proportion': reg_proportion,
+        'src': qsrc,
+        'dtype': dtype,
+        'n_top': n_top,
+    }
+
+
+def main(workers):
+    all_data = {}
+
+    with computed(compute, combos(), workers) as results:
+        for key, entry in results:
+            if entry is None:
+                continue
+            all_data[key] = entry
+            print(f"  {key}: {len(entry['data'])} years")
 
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
     with open(OUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=1)
+        json.dump(all_data, f, ensure_ascii=False, separators=(',', ':'))
     print(f"Wrote {OUT_PATH} ({len(all_data)} datasets)")
 
 
 if __name__ == '__main__':
-    main()
+    main(workers_arg())
@@ -1,10 +1,47 @@
 import sqlite3
+import sys
+import os
 import json
+from array import array
+from collections import Counter
 from typing import Dict, List, Tuple, Set
-import re
 import unicodedata
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from scipy import stats
 import numpy as np
+from db import open_ro
+
+# Every character whose Unicode name says HIRAGANA or KATAKANA, found once
+# so the per-character checks are set lookups.  Some, like ー, are both.
+_HIRAGANA = frozenset(c for c in map(chr, range(0x110000))
+                      if 'HIRAGANA' in unicodedata.name(c, ''))
+_KATAKANA = frozenset(c for c in map(chr, range(0x110000))
+                      if 'KATAKANA' in unicodedata.name(c, ''))
+
+def _nfc(text):
+    """
+    Names and readings are compared in NFC, normalised as they are read
+
+    >>> _nfc('す\u3099') == 'ず'
+    True
+    """
+    return unicodedata.normalize('NFC', text) if text else text
+
+# Markers dropped from kanjidic readings (dots are kept for kun readings)
+_CLEAN_TABLE = str.maketrans('', '', '()-')
+
+# What each character of a name is, see KanjiReadingAnalyzer._classify
+_KIND_HIRAGANA, _KIND_KATAKANA, _KIND_REPETITION, _KIND_KANJI, _KIND_UNKNOWN = range(5)
+
+# Dakuten conversion table (for 々 read voiced, e.g. 寿々 すず)
+_DAKUTEN_MAP = {
+    'か': 'が', 'き': 'ぎ', 'く': 'ぐ', 'け': 'げ', 'こ': 'ご',
+    'さ': 'ざ', 'し': 'じ', 'す': 'ず', 'せ': 'ぜ', 'そ': 'ぞ',
+    'た': 'だ', 'ち': 'ぢ', 'つ': 'づ', 'て': 'で', 'と': 'ど',
+    'は': 'ば', 'ひ': 'び', 'ふ': 'ぶ', 'へ': 'べ', 'ほ': 'ぼ',
+    'ぱ': 'ば', 'ぴ': 'び', 'ぷ': 'ぶ', 'ぺ': 'べ', 'ぽ': 'ぼ'
+}
 
 class KanjiReadingAnalyzer:
     """
@@ -13,26 +50,32 @@ class KanjiReadingAnalyzer:
     """
     def __init__(self, db_path: str = 'namae.db'):
         self.kanji_readings = {}  # kanji -> {'kun': set, 'on': set, 'nanori': set}
+        self.kanji_expanded = {}  # kanji -> readings as matched, see _expanded_readings
+        self.kanji_by_first = {}  # kanji -> the same, bucketed by first kana, see _readings_from
         self.db_path = db_path
+        # the same names come up year after year; cleared when kanjidic is (re)loaded
+        self._cached_analysis = lru_cache(maxsize=200_000)(self._analysis_tuple)
     
-    def load_kanjidic(self, table_name: str = 'kanji'):
+    def load_kanjidic(self, table_name: str = 'kanji', conn=None):
         """
         Load kanji dictionary data from SQLite database
+        (pass conn to read it through an already open connection)
         
         >>> # This would work with a real database
         >>> # analyzer = KanjiReadingAnalyzer('test.db')
         >>> # analyzer.load_kanjidic('kanji')
         """
+        own_conn = conn is None
         try:
-            conn = sqlite3.connect(self.db_path)
+            if own_conn:
+                conn = open_ro(self.db_path)
             cursor = conn.cursor()
             
             # Query to get kanji data
             cursor.execute(f"SELECT kanji, kunyomi, onyomi, nanori FROM {table_name}")
-            rows = cursor.fetchall()
             
-            for row in rows:
-                kanji, kunyomi, onyomi, nanori = row
+            for row in cursor:
+                kanji, kunyomi, onyomi, nanori = map(_nfc, row)
                 
                 if not kanji:  # Skip empty kanji
                     continue
@@ -59,20 +102,81 @@ class KanjiReadingAnalyzer:
                     'on': on_readings,
                     'nanori': nanori_readings
                 }
+                self.kanji_expanded.pop(kanji, None)
+                self.kanji_by_first.pop(kanji, None)
+                self._expanded_readings(kanji)
             
-            conn.close()
-            print(f"Loaded {len(self.kanji_readings)} kanji from {self.db_path}")
+            if own_conn:
+                conn.close()
+            self._cached_analysis.cache_clear()
+            print(f"Loaded {len(self.kanji_readings)} kanji from {table_name}")
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
         except Exception as e:
             print(f"Error loading kanji data: {e}")
     
+    def _expanded_readings(self, char: str) -> Tuple[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]]:
+        """
+        The (reading, type) pairs a kanji can match, with kun readings
+        expanded and markers removed, shortest first and longest first
+        (ties keep kun, on, nanori order).  Worked out once per kanji.
+
+        >>> analyzer = KanjiReadingAnalyzer()
+        >>> analyzer.kanji_readings['翔'] = {'kun': {'かけ.る'}, 'on': {'しょう'}, 'nanori': set()}
+        >>> analyzer._expanded_readings('翔')[0]
+        (('かけ', 'kun'), ('かける', 'kun'), ('しょう', 'on'))
+        """
+        if char not in self.kanji_expanded:
+            readings = []
+            for reading_type in ['kun', 'on', 'nanori']:
+                for reading in self.kanji_readings[char][reading_type]:
+                    clean_reading = self._clean_reading(reading)
+
+                    # For kun readings, try both expanded forms
+                    if reading_type == 'kun':
+                        expanded_readings = self._expand_kun_reading(clean_reading)
+                    else:
+                        expanded_readings = [clean_reading.replace('.', '')]
+                    # many kanji share readings: keep one copy of each string
+                    readings.extend((sys.intern(r), reading_type) for r in expanded_readings)
+            self.kanji_expanded[char] = (
+                tuple(sorted(readings, key=lambda x: len(x[0]))),
+                tuple(sorted(readings, key=lambda x: len(x[0]), reverse=True)))
+        return self.kanji_expanded[char]
+
+    def _readings_from(self, char: str, pron: str, pron_idx: int, longest_first: bool = False) -> Tuple[Tuple[str, str], ...]:
+        """
+        The expanded readings of a kanji that could match pron at pron_idx:
+        those starting with that kana (and any empty ones), in the same
+        order as _expanded_readings.  The buckets are built once per kanji.
+
+        >>> analyzer = KanjiReadingAnalyzer()
+        >>> analyzer.kanji_readings['翔'] = {'kun': {'かけ.る'}, 'on': {'しょう'}, 'nanori': set()}
+        >>> analyzer._readings_from('翔', 'しょうた', 0)
+        (('しょう', 'on'),)
+        >>> analyzer._readings_from('翔', 'しょうた', 4)
+        ()
+        """
+        if char not in self.kanji_by_first:
+            buckets = []
+            for ordered in self._expanded_readings(char):
+                firsts = {r[0] for r, _ in ordered if r}
+                # '' (no kana left, or none that starts a reading): only the empty readings
+                bucket = {f: tuple((r, t) for r, t in ordered if not r or r[0] == f)
+                          for f in firsts}
+                bucket[''] = tuple((r, t) for r, t in ordered if not r)
+                buckets.append(bucket)
+            self.kanji_by_first[char] = tuple(buckets)
+        bucket = self.kanji_by_first[char][longest_first]
+        if pron_idx < len(pron):
+            return bucket.get(pron[pron_idx], bucket[''])
+        return bucket['']
+
     def _clean_reading(self, reading: str) -> str:
         """Clean up reading by removing special markers (except for kun readings with dots)"""
         # Remove other common markers but preserve dots for kun readings
-        reading = re.sub(r'[()-]', '', reading)
-        return reading.strip()
+        return reading.translate(_CLEAN_TABLE).strip()
     
     def analyze_name_reading(self, orth: str, pron: str) -> List[Tuple[str, str, str]]:
         """
@@ -108,193 +212,174 @@ class KanjiReadingAnalyzer:
         >>> result
         [('寿', 'す', 'on'), ('々', 'ず', 'repetition')]
         """
+        return self._parse(orth, pron)[0]
+    
+    def _parse(self, orth: str, pron: str) -> Tuple[List[Tuple[str, str, str]], bool]:
+        """
+        The parse for analyze_name_reading, and whether it has an irregular
+        reading (only the greedy fallback ever marks one)
+        """
         if not orth or not pron:
-            return []
+            return [], False
         
         # Try backtracking first for optimal parsing
         result = self._find_best_parsing(orth, pron)
         if result is not None:
-            return result
+            return result, False
         
         # If backtracking fails, fall back to greedy matching
         return self._greedy_parsing(orth, pron)
     
+    def _analysis_tuple(self, orth: str, pron: str) -> Tuple[Tuple[Tuple[str, str, str], ...], bool]:
+        """_parse with the parse as a tuple, so cached results can be shared"""
+        result, irregular = self._parse(orth, pron)
+        return tuple(result), irregular
+    
     def _find_best_parsing(self, orth: str, pron: str) -> List[Tuple[str, str, str]]:
         """
         Find the best parsing using backtracking that minimizes irregular readings
         Returns None if no complete parsing is possible
+
+        The search is depth first with an explicit stack of
+        (char_idx, pron_idx, prev, remaining choices) frames and one path
+        list that readings are pushed onto and popped off.  The first
+        complete parse wins, so only states that failed need remembering:
+        the rest of the name from (char_idx, pron_idx) (and, before 々,
+        the previous reading) fails the same way whatever came before.
         """
-        def backtrack(char_idx: int, pron_idx: int, current_result: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
-            # Base case: processed all characters
-            if char_idx >= len(orth):
-                # Check that we've consumed exactly the full pronunciation
-                if pron_idx == len(pron):
-                    # Verify concatenated readings match the target pronunciation
-                    concatenated = ''.join(reading for _, reading, _ in current_result if reading)
-                    if concatenated == pron:
-                        return current_result.copy()
-                return None  # Either leftover pronunciation or concatenation mismatch
-            
-            char = orth[char_idx]
-            remaining_pron = pron[pron_idx:]
-            
-            # Handle hiragana characters
-            if self._is_hiragana(char):
-                if remaining_pron.startswith(char):
-                    new_result = current_result + [(char, char, 'hiragana')]
-                    final_result = backtrack(char_idx + 1, pron_idx + 1, new_result)
-                    if final_result is not None:
-                        return final_result
-                return None  # Hiragana must match exactly
-            
-            # Handle katakana characters
-            if self._is_katakana(char):
-                hiragana_char = self._katakana_to_hiragana(char)
-                if remaining_pron.startswith(hiragana_char):
-                    new_result = current_result + [(char, hiragana_char, 'katakana')]
-                    final_result = backtrack(char_idx + 1, pron_idx + 1, new_result)
-                    if final_result is not None:
-                        return final_result
-                return None  # Katakana must match exactly
-            
-            # Handle repetition mark 々
-            if char == '々':
-                if len(current_result) > 0:
-                    # Get the reading of the previous character
-                    prev_char, prev_reading, prev_type = current_result[-1]
-                    
+        n_orth, n_pron = len(orth), len(pron)
+        if n_orth == 0:
+            return [] if n_pron == 0 else None
+        kinds, kana = self._classify_name(orth)
+        
+        def choices(char_idx: int, pron_idx: int, prev):
+            """The (reading, type) pairs that match pron at pron_idx, in the order to try them"""
+            kind = kinds[char_idx]
+            
+            # Handle hiragana and katakana characters (must match exactly)
+            if kind == _KIND_HIRAGANA or kind == _KIND_KATAKANA:
+                if pron.startswith(kana[char_idx], pron_idx):
+                    return [(kana[char_idx], 'hiragana' if kind == _KIND_HIRAGANA else 'katakana')]
+                return []
+            
+            # Handle repetition mark 々: the previous reading, then voiced
+            if kind == _KIND_REPETITION:
+                found = []
+                if prev is not None:
+                    prev_reading, prev_type = prev
                     if prev_reading and prev_type not in ['irregular', 'unknown']:
-                        # Try exact repetition first
-                        if remaining_pron.startswith(prev_reading):
-                            new_result = current_result + [(char, prev_reading, 'repetition')]
-                            final_result = backtrack(char_idx + 1, pron_idx + len(prev_reading), new_result)
-                            if final_result is not None:
-                                return final_result
-                        
-                        # Try with dakuten (voiced version)
+                        if pron.startswith(prev_reading, pron_idx):
+                            found.append((prev_reading, 'repetition'))
                         dakuten_reading = self._add_dakuten(prev_reading)
-                        if dakuten_reading != prev_reading and remaining_pron.startswith(dakuten_reading):
-                            new_result = current_result + [(char, dakuten_reading, 'repetition')]
-                            final_result = backtrack(char_idx + 1, pron_idx + len(dakuten_reading), new_result)
-                            if final_result is not None:
-                                return final_result
-                
-                return None  # Failed to match repetition mark
-            
-            # Handle kanji characters
-            if char not in self.kanji_readings:
-                return None  # Unknown characters prevent complete parsing
+                        if dakuten_reading != prev_reading and pron.startswith(dakuten_reading, pron_idx):
+                            found.append((dakuten_reading, 'repetition'))
+                return found
             
-            # Try all possible readings for this kanji
-            possible_matches = []
+            # Unknown characters prevent complete parsing
+            if kind == _KIND_UNKNOWN:
+                return []
             
-            for reading_type in ['kun', 'on', 'nanori']:
-                for reading in self.kanji_readings[char][reading_type]:
-                    clean_reading = self._clean_reading(reading)
-                    
-                    # For kun readings, try both expanded forms
-                    if reading_type == 'kun':
-                        expanded_readings = self._expand_kun_reading(clean_reading)
-                    else:
-                        expanded_readings = [clean_reading.replace('.', '')]
-                    
-                    for expanded_reading in expanded_readings:
-                        if remaining_pron.startswith(expanded_reading):
-                            possible_matches.append((expanded_reading, reading_type))
-            
-            # Sort by length (longer first for single character names, shorter first for multi-character)
+            # Try all possible readings for this kanji, by length
+            # (longer first for single character names, shorter first for multi-character)
             # This handles cases like 翔|かける (should use full かける) vs 敦士|あつし (should use あつ+し)
-            if len(orth) == 1:
-                # Single character: prefer longer matches (complete pronunciation)
-                possible_matches.sort(key=lambda x: len(x[0]), reverse=True)
+            return [(r, t) for r, t in self._readings_from(orth[char_idx], pron, pron_idx, n_orth == 1)
+                    if pron.startswith(r, pron_idx)]
+        
+        failed = set()
+        path = []
+        stack = [(0, 0, None, iter(choices(0, 0, None)))]
+        while stack:
+            char_idx, pron_idx, prev, options = stack[-1]
+            for reading, reading_type in options:
+                nxt, nxt_pron = char_idx + 1, pron_idx + len(reading)
+                if nxt == n_orth:
+                    # Processed all characters: done if all the pronunciation is used
+                    if nxt_pron == n_pron:
+                        path.append((orth[char_idx], reading, reading_type))
+                        return path
+                    continue
+                nxt_prev = (reading, reading_type) if kinds[nxt] == _KIND_REPETITION else None
+                if (nxt, nxt_pron, nxt_prev) in failed:
+                    continue
+                path.append((orth[char_idx], reading, reading_type))
+                stack.append((nxt, nxt_pron, nxt_prev, iter(choices(nxt, nxt_pron, nxt_prev))))
+                break
             else:
-                # Multiple characters: prefer shorter matches (allow other chars to match)
-                possible_matches.sort(key=lambda x: len(x[0]))
-            
-            # Try each possible match
-            for match_reading, match_type in possible_matches:
-                new_result = current_result + [(char, match_reading, match_type)]
-                final_result = backtrack(char_idx + 1, pron_idx + len(match_reading), new_result)
-                if final_result is not None:
-                    return final_result
-            
-            return None  # No valid reading found
+                # No reading of this character leads to a complete parse
+                stack.pop()
+                failed.add((char_idx, pron_idx, prev))
+                if path:
+                    path.pop()
         
-        return backtrack(0, 0, [])
+        return None
     
     def _greedy_parsing(self, orth: str, pron: str) -> List[Tuple[str, str, str]]:
         """
         Fallback greedy parsing when backtracking fails to find complete solution.
         Tries to match as many characters as possible, marking unmatched as irregular.
+        Returns the parse and whether any character was marked irregular.
         """
         result = []
-        remaining_pron = pron
+        irregular = False  # any character marked irregular
+        pron_idx = 0
+        kinds, kana = self._classify_name(orth)
         
-        for i, char in enumerate(orth):
+        for char, kind, hiragana_char in zip(orth, kinds, kana):
             # Handle hiragana characters
-            if self._is_hiragana(char):
-                if remaining_pron.startswith(char):
+            if kind == _KIND_HIRAGANA:
+                if pron.startswith(char, pron_idx):
                     result.append((char, char, 'hiragana'))
-                    remaining_pron = remaining_pron[1:]
+                    pron_idx += 1
                 else:
                     result.append((char, '', 'irregular'))
+                    irregular = True
                 continue
             
             # Handle katakana characters
-            if self._is_katakana(char):
-                hiragana_char = self._katakana_to_hiragana(char)
-                if remaining_pron.startswith(hiragana_char):
+            if kind == _KIND_KATAKANA:
+                if pron.startswith(hiragana_char, pron_idx):
                     result.append((char, hiragana_char, 'katakana'))
-                    remaining_pron = remaining_pron[1:]
+                    pron_idx += 1
                 else:
                     result.append((char, '', 'irregular'))
+                    irregular = True
                 continue
             
             # Handle repetition mark 々
-            if char == '々':
+            if kind == _KIND_REPETITION:
                 if len(result) > 0:
                     # Get the reading of the previous character
                     prev_char, prev_reading, prev_type = result[-1]
                     
                     if prev_reading and prev_type not in ['irregular', 'unknown']:
                         # Try exact repetition first
-                        if remaining_pron.startswith(prev_reading):
+                        if pron.startswith(prev_reading, pron_idx):
                             result.append((char, prev_reading, 'repetition'))
-                            remaining_pron = remaining_pron[len(prev_reading):]
+                            pron_idx += len(prev_reading)
                             continue
                         
                         # Try with dakuten (voiced version)
                         dakuten_reading = self._add_dakuten(prev_reading)
-                        if dakuten_reading != prev_reading and remaining_pron.startswith(dakuten_reading):
+                        if dakuten_reading != prev_reading and pron.startswith(dakuten_reading, pron_idx):
                             result.append((char, dakuten_reading, 'repetition'))
-                            remaining_pron = remaining_pron[len(dakuten_reading):]
+                            pron_idx += len(dakuten_reading)
                             continue
                 
                 # If repetition matching failed
                 result.append((char, '', 'irregular'))
+                irregular = True
                 continue
             
             # Handle kanji characters
-            if char not in self.kanji_readings:
+            if kind == _KIND_UNKNOWN:
                 result.append((char, '', 'unknown'))
                 continue
             
             # Find best match for this character
-            possible_matches = []
-            
-            for reading_type in ['kun', 'on', 'nanori']:
-                for reading in self.kanji_readings[char][reading_type]:
-                    clean_reading = self._clean_reading(reading)
-                    
-                    # For kun readings, try both expanded forms
-                    if reading_type == 'kun':
-                        expanded_readings = self._expand_kun_reading(clean_reading)
-                    else:
-                        expanded_readings = [clean_reading.replace('.', '')]
-                    
-                    for expanded_reading in expanded_readings:
-                        if remaining_pron.startswith(expanded_reading):
-                            possible_matches.append((expanded_reading, reading_type))
+            # (ties between matches of the same length keep kun, on, nanori order)
+            possible_matches = [(reading, reading_type)
+                                for reading, reading_type in self._readings_from(char, pron, pron_idx)
+                                if pron.startswith(reading, pron_idx)]
             
             # Choose best match based on context
             if possible_matches:
@@ -302,7 +387,7 @@ class KanjiReadingAnalyzer:
                     # Single character: prefer the match that consumes all remaining pronunciation
                     best_match = None
                     for reading, reading_type in possible_matches:
-                        if reading == remaining_pron:  # Exact match for remaining pronunciation
+                        if pron_idx + len(reading) == len(pron):  # Exact match for remaining pronunciation
                             best_match = (reading, reading_type)
                             break
                     
@@ -314,19 +399,49 @@ class KanjiReadingAnalyzer:
                     best_match = min(possible_matches, key=lambda x: len(x[0]))
                 
                 result.append((char, best_match[0], best_match[1]))
-                remaining_pron = remaining_pron[len(best_match[0]):]
+                pron_idx += len(best_match[0])
             else:
                 result.append((char, '', 'irregular'))
+                irregular = True
         
-        return result
+        return result, irregular
     
+    def _classify(self, char: str) -> int:
+        """
+        What sort of character this is for the parsers (one of the _KIND_*)
+
+        >>> analyzer = KanjiReadingAnalyzer()
+        >>> analyzer.kanji_readings['翔'] = {'kun': set(), 'on': {'しょう'}, 'nanori': set()}
+        >>> [analyzer._classify(c) for c in 'あア々翔x']
+        [0, 1, 2, 3, 4]
+        """
+        if char in _HIRAGANA:
+            return _KIND_HIRAGANA
+        if char in _KATAKANA:
+            return _KIND_KATAKANA
+        if char == '々':
+            return _KIND_REPETITION
+        if char in self.kanji_readings:
+            return _KIND_KANJI
+        return _KIND_UNKNOWN
+
+    def _classify_name(self, orth: str) -> Tuple[Tuple[int, ...], Tuple[str, ...]]:
+        """
+        The kind of each character in a name, and the characters with
+        katakana turned into hiragana, worked out once per name
+        """
+        kinds = tuple(map(self._classify, orth))
+        kana = tuple(self._katakana_to_hiragana(c) if k == _KIND_KATAKANA else c
+                     for c, k in zip(orth, kinds))
+        return kinds, kana
+
     def _is_hiragana(self, char: str) -> bool:
         """Check if character is hiragana"""
-        return 'HIRAGANA' in unicodedata.name(char, '')
+        return char in _HIRAGANA
     
     def _is_katakana(self, char: str) -> bool:
         """Check if character is katakana"""
-        return 'KATAKANA' in unicodedata.name(char, '')
+        return char in _KATAKANA
     
     def _katakana_to_hiragana(self, char: str) -> str:
         """Convert katakana character to hiragana"""
@@ -350,22 +465,7 @@ class KanjiReadingAnalyzer:
         >>> analyzer._add_dakuten('み')
         'み'
         """
-        # Dakuten conversion table
-        dakuten_map = {
-            'か': 'が', 'き': 'ぎ', 'く': 'ぐ', 'け': 'げ', 'こ': 'ご',
-            'さ': 'ざ', 'し': 'じ', 'す': 'ず', 'せ': 'ぜ', 'そ': 'ぞ',
-            'た': 'だ', 'ち': 'ぢ', 'つ': 'づ', 'て': 'で', 'と': 'ど',
-            'は': 'ば', 'ひ': 'び', 'ふ': 'ぶ', 'へ': 'べ', 'ほ': 'ぼ',
-            'ぱ': 'ば', 'ぴ': 'び', 'ぷ': 'ぶ', 'ぺ': 'べ', 'ぽ': 'ぼ'
-        }
-        
-        return dakuten_map.get(reading, reading)
-        """Convert katakana character to hiragana"""
-        if self._is_katakana(char):
-            # Convert katakana to hiragana by shifting Unicode value
-            # Katakana starts at U+30A1, hiragana at U+3041
-            return chr(ord(char) - 0x60)
-        return char
+        return _DAKUTEN_MAP.get(reading, reading)
     
     def _expand_kun_reading(self, reading: str) -> List[str]:
         """
@@ -393,19 +493,20 @@ class KanjiReadingAnalyzer:
         results = {}
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = open_ro(self.db_path)
             cursor = conn.cursor()
+            cursor.arraysize = 5000
             
             # Query to get names data
             cursor.execute(f"SELECT nid, orth, pron FROM {table_name}")
-            rows = cursor.fetchall()
             
-            for i, row in enumerate(rows):
+            for i, row in enumerate(cursor):
                 nid, orth, pron = row
+                orth, pron = _nfc(orth), _nfc(pron)
                 
                 if orth and pron:
                     try:
-                        analysis = self.analyze_name_reading(orth, pron)
+                        analysis, _ = self._cached_analysis(orth, pron)
                         results[f"{nid}:{orth}|{pron}"] = analysis
                     except Exception as e:
                         print(f"Error at record {i+1} (nid={nid}): {orth}|{pron}")
@@ -424,36 +525,45 @@ class KanjiReadingAnalyzer:
         
         return results
     
-    def analyze_names_by_demographics(self, table_name: str = 'namae') -> Dict[str, Dict]:
+    def _iter_analyzed(self, table_name: str = 'namae'):
         """
-        Analyze names with demographic information (year, gender)
-        Returns detailed results with demographic breakdowns
+        Yield (nid, year, gender, orth, pron, analysis, has_irregular) for
+        each name with both orth and pron, analysing the rows as they are read
         """
-        results = {}
-        
+        conn = open_ro(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            cursor.arraysize = 5000
             
             # Query to get names data with demographics
-            cursor.execute(f"SELECT nid, year, orth, pron, gender FROM {table_name}")
-            rows = cursor.fetchall()
+            cursor.execute(f"""SELECT nid, year, orth, pron, gender FROM {table_name}
+                               WHERE orth IS NOT NULL AND pron IS NOT NULL""")
             
-            for row in rows:
-                nid, year, orth, pron, gender = row
-                
+            for nid, year, orth, pron, gender in cursor:
+                orth, pron = _nfc(orth), _nfc(pron)
                 if orth and pron:
-                    analysis = self.analyze_name_reading(orth, pron)
-                    results[f"{nid}:{orth}|{pron}"] = {
-                        'analysis': analysis,
-                        'year': year,
-                        'gender': gender,
-                        'orth': orth,
-                        'pron': pron,
-                        'nid': nid
-                    }
-            
+                    yield (nid, year, gender, orth, pron) + self._cached_analysis(orth, pron)
+        finally:
             conn.close()
+    
+    def analyze_names_by_demographics(self, table_name: str = 'namae') -> Dict[str, Dict]:
+        """
+        Analyze names with demographic information (year, gender)
+        Returns detailed results with demographic breakdowns
+        """
+        results = {}
+        
+        try:
+            for nid, year, gender, orth, pron, analysis, _ in self._iter_analyzed(table_name):
+                results[f"{nid}:{orth}|{pron}"] = {
+                    'analysis': analysis,
+                    'year': year,
+                    'gender': gender,
+                    'orth': orth,
+                    'pron': pron,
+                    'nid': nid
+                }
+            
             print(f"Analyzed {len(results)} names with demographics from database")
             
         except sqlite3.Error as e:
@@ -463,9 +573,90 @@ class KanjiReadingAnalyzer:
         
         return results
     
-    def calculate_irregularity_by_demographics(self, table_name: str = 'namae') -> Dict[str, Dict]:
+    def _iter_cell_batches(self, table_name: str, year_idx: Dict, gender_idx: Dict, batch_size: int = 10000):
+        """
+        Lists of up to batch_size (cell, orth, pron, count), one per distinct
+        name with both orth and pron in each year and gender, where cell
+        numbers the (year, gender) and count is how many times it occurs
+        (SQLite groups the rows, so each name is only looked up once a year)
+        """
+        n_genders = len(gender_idx)
+        conn = open_ro(self.db_path)
+        try:
+            cursor = conn.execute(f"""SELECT year, gender, orth, pron, COUNT(*) FROM {table_name}
+                                      WHERE orth IS NOT NULL AND pron IS NOT NULL
+                                      GROUP BY orth, pron, year, gender""")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [(year_idx[year] * n_genders + gender_idx[gender], _nfc(orth), _nfc(pron), count)
+                       for year, gender, orth, pron, count in rows if orth and pron]
+        finally:
+            conn.close()
+    
+    def _count_batch(self, batch, n_cells: int) -> np.ndarray:
+        """Names per (cell, irregular or not) in a batch from _iter_cell_batches"""
+        cells = array('i', (cell * 2 + self._cached_analysis(orth, pron)[1]
+                            for cell, orth, pron, _ in batch))
+        counts = np.fromiter((count for *_, count in batch), dtype=np.float64, count=len(batch))
+        return np.bincount(np.frombuffer(cells, dtype=np.int32), weights=counts,
+                           minlength=n_cells).astype(np.int64)
+    
+    def _analysed_cell_counts(self, table_name: str, year_idx: Dict, gender_idx: Dict,
+                              workers: int = 1) -> np.ndarray:
+        """
+        Names per (cell, irregular or not), analysing each batch from
+        _iter_cell_batches here or, with workers > 1, in a process pool
+        """
+        n_cells = len(year_idx) * len(gender_idx) * 2
+        counts = np.zeros(n_cells, dtype=np.int64)
+        batches = self._iter_cell_batches(table_name, year_idx, gender_idx)
+        if workers <= 1:
+            for batch in batches:
+                counts += self._count_batch(batch, n_cells)
+            return counts
+        
+        # Only two batches a worker are handed out at a time, so the rows
+        # are still fetched from SQLite as the workers need them
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.db_path, self.kanji_readings)) as pool:
+            pending = set()
+            for batch in batches:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        counts += future.result()
+                pending.add(pool.submit(_count_batch, batch, n_cells))
+            for future in pending:
+                counts += future.result()
+        return counts
+    
+    def _mapp_cell_counts(self, conn, table_name: str, year_idx: Dict, gender_idx: Dict) -> np.ndarray:
+        """
+        Names per (cell, irregular or not), counted by SQLite from the
+        mappings calc_feat_uniq.py has already stored in mapp
+        (a mapping is space separated char/reading/type tokens and an
+        irregular character is always char//irregular, so with a space
+        after the mapping '//irregular ' only matches the end of that token)
+        """
+        counts = np.zeros((len(year_idx), len(gender_idx), 2), dtype=np.int64)
+        for year, gender, irregular, count in conn.execute(
+                f"""SELECT n.year, n.gender, m.mapping || ' ' LIKE '%//irregular %', COUNT(*)
+                      FROM {table_name} n
+                      JOIN mapp m ON n.orth = m.orth AND n.pron = m.pron
+                      WHERE n.orth != '' AND n.pron != ''
+                      GROUP BY n.year, n.gender, 3"""):
+            counts[year_idx[year], gender_idx[gender], irregular] = count
+        return counts.reshape(-1)
+    
+    def calculate_irregularity_by_demographics(self, table_name: str = 'namae', workers: int = 1,
+                                               use_mapp: bool = False) -> Dict[str, Dict]:
         """
         Calculate proportion of names with irregular readings by year and gender
+        (with workers > 1 the names are analysed in that many processes;
+        with use_mapp the stored mappings are counted in SQL instead, which
+        only holds if mapp was made with the same kanjidic readings)
         
         Returns structure like:
         {
@@ -478,63 +669,47 @@ class KanjiReadingAnalyzer:
             'overall': {'total': 1000, 'irregular': 150, 'proportion': 0.15}
         }
         """
-        # Get detailed analysis results
-        detailed_results = self.analyze_names_by_demographics(table_name)
-        
-        # Initialize counters
-        by_year = {}
-        by_gender = {}
+        # One cell per (year, gender, irregular or not), counted with numpy:
+        # each batch of names is counted with bincount, and the batches summed
+        try:
+            conn = open_ro(self.db_path)
+            year_gender = conn.execute(f"""SELECT DISTINCT year, gender FROM {table_name}
+                                            WHERE orth IS NOT NULL AND pron IS NOT NULL""").fetchall()
+            year_idx = {y: i for i, y in enumerate(dict.fromkeys(y for y, _ in year_gender))}
+            gender_idx = {g: i for i, g in enumerate(dict.fromkeys(g for _, g in year_gender))}
+            if use_mapp:
+                counts = self._mapp_cell_counts(conn, table_name, year_idx, gender_idx)
+                conn.close()
+            else:
+                conn.close()
+                counts = self._analysed_cell_counts(table_name, year_idx, gender_idx, workers)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            year_idx, gender_idx = {}, {}
+            counts = np.zeros(0, dtype=np.int64)
+        
+        counts = counts.reshape(len(year_idx), len(gender_idx), 2)
+        totals = counts.sum(axis=2)
+        irregulars = counts[:, :, 1]
+        
+        def cell(total, irregular):
+            total, irregular = int(total), int(irregular)
+            return {'total': total, 'irregular': irregular,
+                    'proportion': irregular / total if total > 0 else 0}
+        
+        # Back to the nested dicts, for the years/genders that have names
+        by_year = {year: cell(totals[i].sum(), irregulars[i].sum())
+                   for year, i in year_idx.items() if totals[i].sum() > 0}
+        by_gender = {gender: cell(totals[:, j].sum(), irregulars[:, j].sum())
+                     for gender, j in gender_idx.items() if totals[:, j].sum() > 0}
         by_year_gender = {}
-        overall_total = 0
-        overall_irregular = 0
-        
-        for name_key, data in detailed_results.items():
-            analysis = data['analysis']
-            year = data['year']
-            gender = data['gender']
-            
-            # Check if name has any irregular readings
-            has_irregular = any(reading_type == 'irregular' for _, _, reading_type in analysis)
-            
-            # Update overall counters
-            overall_total += 1
-            if has_irregular:
-                overall_irregular += 1
-            
-            # Update by year
-            if year not in by_year:
-                by_year[year] = {'total': 0, 'irregular': 0}
-            by_year[year]['total'] += 1
-            if has_irregular:
-                by_year[year]['irregular'] += 1
-            
-            # Update by gender
-            if gender not in by_gender:
-                by_gender[gender] = {'total': 0, 'irregular': 0}
-            by_gender[gender]['total'] += 1
-            if has_irregular:
-                by_gender[gender]['irregular'] += 1
-            
-            # Update by year and gender
-            if year not in by_year_gender:
-                by_year_gender[year] = {}
-            if gender not in by_year_gender[year]:
-                by_year_gender[year][gender] = {'total': 0, 'irregular': 0}
-            by_year_gender[year][gender]['total'] += 1
-            if has_irregular:
-                by_year_gender[year][gender]['irregular'] += 1
-        
-        # Calculate proportions
-        for year_data in by_year.values():
-            year_data['proportion'] = year_data['irregular'] / year_data['total'] if year_data['total'] > 0 else 0
-        
-        for gender_data in by_gender.values():
-            gender_data['proportion'] = gender_data['irregular'] / gender_data['total'] if gender_data['total'] > 0 else 0
-        
-        for year_dict in by_year_gender.values():
-            for gender_data in year_dict.values():
-                gender_data['proportion'] = gender_data['irregular'] / gender_data['total'] if gender_data['total'] > 0 else 0
+        for year, i in year_idx.items():
+            for gender, j in gender_idx.items():
+                if totals[i, j] > 0:
+                    by_year_gender.setdefault(year, {})[gender] = cell(totals[i, j], irregulars[i, j])
         
+        overall_total = int(totals.sum())
+        overall_irregular = int(irregulars.sum())
         overall_proportion = overall_irregular / overall_total if overall_total > 0 else 0
         
         return {
@@ -548,45 +723,50 @@ class KanjiReadingAnalyzer:
             }
         }
     
-    def print_irregularity_report(self, table_name: str = 'namae', data: str = None):
+    def print_irregularity_report(self, table_name: str = 'namae', data: str = None, workers: int = 1,
+                                  use_mapp: bool = False):
         """
         Print a formatted report of irregularity statistics
         
         Args:
             table_name: Name of the database table to analyze
             data: Optional path to save JSON data (e.g., 'path/irregular.json')
+            workers: Number of processes to analyse the names in
+            use_mapp: Count the mappings already stored in mapp instead
         """
-        irregularity_stats = self.calculate_irregularity_by_demographics(table_name)
+        irregularity_stats = self.calculate_irregularity_by_demographics(table_name, workers, use_mapp)
         
-        print("=" * 60)
-        print("JAPANESE NAME READING IRREGULARITY REPORT")
-        print("=" * 60)
+        # The report is collected and written out in one go
+        lines = []
+        lines.append("=" * 60)
+        lines.append("JAPANESE NAME READING IRREGULARITY REPORT")
+        lines.append("=" * 60)
         
         # Overall statistics
         overall = irregularity_stats['overall']
-        print(f"\nOVERALL STATISTICS:")
-        print(f"Total names analyzed: {overall['total']}")
-        print(f"Names with irregular readings: {overall['irregular']}")
-        print(f"Proportion irregular: {overall['proportion']:.1%}")
+        lines.append(f"\nOVERALL STATISTICS:")
+        lines.append(f"Total names analyzed: {overall['total']}")
+        lines.append(f"Names with irregular readings: {overall['irregular']}")
+        lines.append(f"Proportion irregular: {overall['proportion']:.1%}")
         
         # By year
-        print(f"\nBY YEAR:")
-        print(f"{'Year':<6} {'Total':<8} {'Irregular':<10} {'Proportion':<12}")
-        print("-" * 40)
+        lines.append(f"\nBY YEAR:")
+        lines.append(f"{'Year':<6} {'Total':<8} {'Irregular':<10} {'Proportion':<12}")
+        lines.append("-" * 40)
         for year in sorted(irregularity_stats['by_year'].keys()):
             data_row = irregularity_stats['by_year'][year]
-            print(f"{year:<6} {data_row['total']:<8} {data_row['irregular']:<10} {data_row['proportion']:<12.1%}")
+            lines.append(f"{year:<6} {data_row['total']:<8} {data_row['irregular']:<10} {data_row['proportion']:<12.1%}")
         
         # By gender
-        print(f"\nBY GENDER:")
-        print(f"{'Gender':<8} {'Total':<8} {'Irregular':<10} {'Proportion':<12}")
-        print("-" * 42)
+        lines.append(f"\nBY GENDER:")
+        lines.append(f"{'Gender':<8} {'Total':<8} {'Irregular':<10} {'Proportion':<12}")
+        lines.append("-" * 42)
         for gender in sorted(irregularity_stats['by_gender'].keys()):
             data_row = irregularity_stats['by_gender'][gender]
-            print(f"{gender:<8} {data_row['total']:<8} {data_row['irregular']:<10} {data_row['proportion']:<12.1%}")
+            lines.append(f"{gender:<8} {data_row['total']:<8} {data_row['irregular']:<10} {data_row['proportion']:<12.1%}")
         
         # By year and gender (condensed view)
-        print(f"\nBY YEAR AND GENDER:")
+        lines.append(f"\nBY YEAR AND GENDER:")
         years = sorted(irregularity_stats['by_year_gender'].keys())
         genders = sorted(set().union(*[year_dict.keys() for year_dict in irregularity_stats['by_year_gender'].values()]))
         
@@ -594,8 +774,8 @@ class KanjiReadingAnalyzer:
         header = f"{'Year':<6}"
         for gender in genders:
             header += f" {gender}(Tot/Irr/%)  "
-        print(header)
-        print("-" * len(header))
+        lines.append(header)
+        lines.append("-" * len(header))
         
         # Data rows
         for year in years:
@@ -606,9 +786,10 @@ class KanjiReadingAnalyzer:
                     row += f" {data_row['total']:3}/{data_row['irregular']:3}/{data_row['proportion']:4.1%} "
                 else:
                     row += " " + " " * 12
-            print(row)
+            lines.append(row)
         
-        print("=" * 60)
+        lines.append("=" * 60)
+        sys.stdout.write("\n".join(lines) + "\n")
         
         # Save JSON data if requested
         if data:
@@ -633,9 +814,10 @@ class KanjiReadingAnalyzer:
              - It compares observed vs expected frequencies
              - It's appropriate for count data
         """
-        print("\n" + "=" * 60)
-        print("STATISTICAL TESTS")
-        print("=" * 60)
+        lines = []  # written out in one go at the end
+        lines.append("\n" + "=" * 60)
+        lines.append("STATISTICAL TESTS")
+        lines.append("=" * 60)
         
         # Test 1: Trend over time (Spearman correlation)
         years = sorted(irregularity_stats['by_year'].keys())
@@ -644,69 +826,61 @@ class KanjiReadingAnalyzer:
         if len(years) > 2:  # Need at least 3 points for meaningful correlation
             spearman_corr, spearman_p = stats.spearmanr(years, proportions)
             
-            print(f"\n1. TREND OVER TIME (Spearman Rank Correlation)")
-            print(f"   Correlation coefficient: {spearman_corr:.4f}")
-            print(f"   P-value: {spearman_p:.4f}")
+            lines.append(f"\n1. TREND OVER TIME (Spearman Rank Correlation)")
+            lines.append(f"   Correlation coefficient: {spearman_corr:.4f}")
+            lines.append(f"   P-value: {spearman_p:.4f}")
             
             if spearman_p < 0.05:
                 trend_direction = "increasing" if spearman_corr > 0 else "decreasing"
-                print(f"   Result: Irregularity is SIGNIFICANTLY {trend_direction} over time")
+                lines.append(f"   Result: Irregularity is SIGNIFICANTLY {trend_direction} over time")
             else:
-                print(f"   Result: NO significant trend over time")
+                lines.append(f"   Result: NO significant trend over time")
             
-            print(f"   Interpretation: Spearman correlation tests for monotonic trends")
-            print(f"   without assuming linear relationship or normal distribution.")
+            lines.append(f"   Interpretation: Spearman correlation tests for monotonic trends")
+            lines.append(f"   without assuming linear relationship or normal distribution.")
         else:
-            print(f"\n1. TREND OVER TIME: Insufficient data (need ≥3 years)")
+            lines.append(f"\n1. TREND OVER TIME: Insufficient data (need ≥3 years)")
         
         # Test 2: Gender differences (Chi-square test)
         gender_data = irregularity_stats['by_gender']
         if len(gender_data) >= 2:
             # Create contingency table: [irregular_counts, regular_counts] for each gender
             genders = sorted(gender_data.keys())
-            contingency_table = []
-            
-            for gender in genders:
-                irregular = gender_data[gender]['irregular']
-                regular = gender_data[gender]['total'] - irregular
-                contingency_table.append([irregular, regular])
-            
-            contingency_table = np.array(contingency_table)
+            totals = np.array([gender_data[g]['total'] for g in genders], dtype=np.int64)
+            irregulars = np.array([gender_data[g]['irregular'] for g in genders], dtype=np.int64)
+            contingency_table = np.column_stack([irregulars, totals - irregulars])
             
             # Perform chi-square test
             chi2, chi2_p, dof, expected = stats.chi2_contingency(contingency_table)
             
-            print(f"\n2. GENDER DIFFERENCES (Chi-square Test of Independence)")
-            print(f"   Chi-square statistic: {chi2:.4f}")
-            print(f"   P-value: {chi2_p:.4f}")
-            print(f"   Degrees of freedom: {dof}")
+            lines.append(f"\n2. GENDER DIFFERENCES (Chi-square Test of Independence)")
+            lines.append(f"   Chi-square statistic: {chi2:.4f}")
+            lines.append(f"   P-value: {chi2_p:.4f}")
+            lines.append(f"   Degrees of freedom: {dof}")
             
             if chi2_p < 0.05:
-                print(f"   Result: Gender and irregularity are SIGNIFICANTLY associated")
+                lines.append(f"   Result: Gender and irregularity are SIGNIFICANTLY associated")
                 
                 # Show which gender has higher irregularity
-                gender_props = {g: gender_data[g]['proportion'] for g in genders}
-                highest_gender = max(gender_props.keys(), key=lambda g: gender_props[g])
-                print(f"   {highest_gender} names have higher irregularity rate")
+                highest_gender = genders[int(np.argmax(irregulars / totals))]
+                lines.append(f"   {highest_gender} names have higher irregularity rate")
             else:
-                print(f"   Result: NO significant association between gender and irregularity")
+                lines.append(f"   Result: NO significant association between gender and irregularity")
             
-            print(f"   Interpretation: Chi-square tests if gender and reading irregularity")
-            print(f"   are independent (H0) or associated (H1).")
+            lines.append(f"   Interpretation: Chi-square tests if gender and reading irregularity")
+            lines.append(f"   are independent (H0) or associated (H1).")
             
             # Show contingency table
-            print(f"\n   Contingency Table:")
-            print(f"   {'Gender':<8} {'Irregular':<12} {'Regular':<12} {'Total':<12}")
-            print(f"   {'-'*48}")
-            for i, gender in enumerate(genders):
-                irregular_count = contingency_table[i][0]
-                regular_count = contingency_table[i][1]
-                total_count = irregular_count + regular_count
-                print(f"   {gender:<8} {irregular_count:<12} {regular_count:<12} {total_count:<12}")
+            lines.append(f"\n   Contingency Table:")
+            lines.append(f"   {'Gender':<8} {'Irregular':<12} {'Regular':<12} {'Total':<12}")
+            lines.append(f"   {'-'*48}")
+            for gender, (irregular_count, regular_count), total_count in zip(genders, contingency_table, totals):
+                lines.append(f"   {gender:<8} {irregular_count:<12} {regular_count:<12} {total_count:<12}")
         else:
-            print(f"\n2. GENDER DIFFERENCES: Insufficient data (need ≥2 genders)")
+            lines.append(f"\n2. GENDER DIFFERENCES: Insufficient data (need ≥2 genders)")
         
-        print("=" * 60)
+        lines.append("=" * 60)
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def _save_irregularity_json(self, stats: Dict, filepath: str):
         """Save irregularity statistics as JSON in table format"""
@@ -731,36 +905,20 @@ class KanjiReadingAnalyzer:
             }
             
             # Fill by_year data
-            for year in sorted(stats['by_year'].keys()):
-                data_row = stats['by_year'][year]
-                json_data["by_year"]["rows"].append([
-                    str(year),
-                    str(data_row['total']),
-                    str(data_row['irregular']),
-                    f"{data_row['proportion']:.3f}"
-                ])
+            json_data["by_year"]["rows"] = [
+                [str(year), str(d['total']), str(d['irregular']), f"{d['proportion']:.3f}"]
+                for year, d in sorted(stats['by_year'].items())]
             
             # Fill by_gender data
-            for gender in sorted(stats['by_gender'].keys()):
-                data_row = stats['by_gender'][gender]
-                json_data["by_gender"]["rows"].append([
-                    gender,
-                    str(data_row['total']),
-                    str(data_row['irregular']),
-                    f"{data_row['proportion']:.3f}"
-                ])
+            json_data["by_gender"]["rows"] = [
+                [gender, str(d['total']), str(d['irregular']), f"{d['proportion']:.3f}"]
+                for gender, d in sorted(stats['by_gender'].items())]
             
             # Fill by_year_gender data
-            for year in sorted(stats['by_year_gender'].keys()):
-                for gender in sorted(stats['by_year_gender'][year].keys()):
-                    data_row = stats['by_year_gender'][year][gender]
-                    json_data["by_year_gender"]["rows"].append([
-                        str(year),
-                        gender,
-                        str(data_row['total']),
-                        str(data_row['irregular']),
-                        f"{data_row['proportion']:.3f}"
-                    ])
+            json_data["by_year_gender"]["rows"] = [
+                [str(year), gender, str(d['total']), str(d['irregular']), f"{d['proportion']:.3f}"]
+                for year, year_dict in sorted(stats['by_year_gender'].items())
+                for gender, d in sorted(year_dict.items())]
             
             # Write to file
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -773,19 +931,21 @@ class KanjiReadingAnalyzer:
     
     def print_analysis_results(self, results: Dict[str, List[Tuple[str, str, str]]]):
         """Print analysis results in a readable format"""
+        available = {}  # kanji -> its readings as shown, worked out once
         for name_key, analysis in results.items():
             print(f"\n{name_key}:")
             for char, reading, reading_type in analysis:
                 if reading_type == 'irregular':
                     # Show available readings for irregular characters
                     if char in self.kanji_readings:
-                        available_readings = []
-                        for read_type in ['kun', 'on', 'nanori']:
-                            if self.kanji_readings[char][read_type]:
-                                readings_list = list(self.kanji_readings[char][read_type])
-                                available_readings.append(f"{read_type}: {', '.join(readings_list)}")
-                        available_str = "; ".join(available_readings) if available_readings else "no readings"
-                        print(f"  {char}: IRREGULAR (available: {available_str})")
+                        if char not in available:
+                            available_readings = []
+                            for read_type in ['kun', 'on', 'nanori']:
+                                if self.kanji_readings[char][read_type]:
+                                    readings_list = list(self.kanji_readings[char][read_type])
+                                    available_readings.append(f"{read_type}: {', '.join(readings_list)}")
+                            available[char] = "; ".join(available_readings) if available_readings else "no readings"
+                        print(f"  {char}: IRREGULAR (available: {available[char]})")
                     else:
                         print(f"  {char}: IRREGULAR (no matching reading found)")
                 elif reading_type == 'unknown':
@@ -794,38 +954,45 @@ class KanjiReadingAnalyzer:
                     print(f"  {char}: '{reading}' ({reading_type})")
     
     def get_regularity_stats(self, results: Dict[str, List[Tuple[str, str, str]]]) -> Dict[str, int]:
-        """Get statistics about reading regularity"""
+        """
+        Get statistics about reading regularity
+
+        >>> analyzer = KanjiReadingAnalyzer()
+        >>> analyzer.get_regularity_stats({'1:敦子|あつこ': [('敦', 'あつ', 'nanori'), ('子', 'こ', 'kun')],
+        ...                                '2:ゆい|ゆい': [('ゆ', 'ゆ', 'hiragana'), ('い', 'い', 'hiragana')]})
+        {'total_characters': 4, 'kun_readings': 1, 'on_readings': 0, 'nanori_readings': 1, 'irregular_readings': 0, 'unknown_characters': 0, 'hiragana_characters': 2}
+        """
+        # Tally the reading types in one go (Counter counts in C)
+        types = Counter(reading_type for analysis in results.values()
+                        for _, _, reading_type in analysis)
         stats = {
-            'total_characters': 0,
-            'kun_readings': 0,
-            'on_readings': 0,
-            'nanori_readings': 0,
-            'irregular_readings': 0,
-            'unknown_characters': 0
+            'total_characters': sum(types.values()),
+            'kun_readings': types['kun'],
+            'on_readings': types['on'],
+            'nanori_readings': types['nanori'],
+            'irregular_readings': types['irregular'],
+            'unknown_characters': types['unknown']
         }
-        
-        for analysis in results.values():
-            for char, reading, reading_type in analysis:
-                stats['total_characters'] += 1
-                if reading_type == 'kun':
-                    stats['kun_readings'] += 1
-                elif reading_type == 'on':
-                    stats['on_readings'] += 1
-                elif reading_type == 'nanori':
-                    stats['nanori_readings'] += 1
-                elif reading_type == 'irregular':
-                    stats['irregular_readings'] += 1
-                elif reading_type == 'unknown':
-                    stats['unknown_characters'] += 1
-                elif reading_type == 'hiragana':
-                    stats['hiragana_characters'] = stats.get('hiragana_characters', 0) + 1
-                elif reading_type == 'katakana':
-                    stats['katakana_characters'] = stats.get('katakana_characters', 0) + 1
-                elif reading_type == 'repetition':
-                    stats['repetition_characters'] = stats.get('repetition_characters', 0) + 1
+        # These are only reported when they occur
+        for reading_type in ['hiragana', 'katakana', 'repetition']:
+            if types[reading_type]:
+                stats[f'{reading_type}_characters'] = types[reading_type]
         
         return stats
 
+_pool_analyzer = None  # per worker process, set by _init_worker()
+
+
+def _init_worker(db_path, kanji_readings):
+    global _pool_analyzer
+    _pool_analyzer = KanjiReadingAnalyzer(db_path)
+    _pool_analyzer.kanji_readings = kanji_readings
+
+
+def _count_batch(batch, n_cells):
+    return _pool_analyzer._count_batch(batch, n_cells)
+
+
 # Example usage:
 if __name__ == "__main__":
     analyzer = KanjiReadingAnalyzer('../web/db/namae.db')  # Uses 'namae.db' by default
@@ -836,7 +1003,10 @@ if __name__ == "__main__":
     analyzer.print_analysis_results(results)
     rstats = analyzer.get_regularity_stats(results) 
     print(rstats)
-    analyzer.print_irregularity_report()
+    # --mapp counts the mappings calc_feat_uniq.py stored instead of
+    # analysing the names again (same kanjidic readings only)
+    analyzer.print_irregularity_report(workers=os.cpu_count() or 1,
+                                       use_mapp='--mapp' in sys.argv[1:])
     
     print("KanjiReadingAnalyzer class ready!")
     print("Usage:")
@@ -845,4 +1015,5 @@ if __name__ == "__main__":
     print("3. analyzer.analyze_name_reading('龍汰', 'りゅうた')")
     print("4. analyzer.analyze_names_from_db()  # Analyze from 'namae' table")
     print("5. analyzer.print_irregularity_report()  # Demographics report")
+    print("   (run with --mapp to count the stored mappings instead)")
     print("\nRun doctests with: python -m doctest filename.py -v")
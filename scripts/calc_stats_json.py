@@ -7,98 +7,115 @@
 ###  15 feature queries over 14.5M rows — ~6 minutes.  Pre-computing
 ###  reduces it to a JSON read.
 ###
+###  The attr features are all counted in one scan per database
+###  (count_features); only Kanji (via ntok) has its own query.
+###
+###  usage: python calc_stats_json.py [workers]
+###  (defaults to one worker per CPU; each has its own read-only connection)
+###
 
-import sys, os, json, sqlite3
-import numpy as np
-
-from db import db_options, resolve_src, get_stats, get_feature
-
+import sys, os
+import orjson
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer,)):
-            return int(obj)
-        if isinstance(obj, (np.floating,)):
-            return float(obj)
-        if isinstance(obj, (np.bool_,)):
-            return bool(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
+from db import db_options, resolve_src, get_stats, get_feature, \
+    count_features, summarise_feature
+import precompute
+from precompute import computed, skip, workers_arg
 from settings import features
 
-DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
 OUT_PATH = os.path.join('..', 'web', 'static', 'data', 'stats_data.json')
 
 threshold = 2  # same as routes.py
 
 
+def encode(obj):
+    """compact UTF-8 JSON; numpy scalars and arrays are written as numbers/lists"""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def compute(src_key):
+    """(src_key, the encoded dataset) or (src_key, None) if it failed"""
+    table = db_options[src_key][0]
+    qsrc = resolve_src(src_key)
+
+    print(f"  {src_key} ({qsrc}, table={table}):", flush=True)
+
+    # get_stats result
+    try:
+        stats = get_stats(precompute.conn, table=table, src=qsrc)
+    except Exception as e:
+        return src_key, skip(src_key, f"stats: {e}")
+
+    # Convert nested defaultdict to plain dict for JSON
+    stats_plain = {}
+    for k1 in stats:
+        stats_plain[k1] = {}
+        for k2 in stats[k1]:
+            stats_plain[k1][k2] = dict(stats[k1][k2]) if hasattr(stats[k1][k2], 'items') else stats[k1][k2]
+
+    # Feature summaries (short=True → no examples or per-category tests)
+    visible = [f for f in features if src_key in f[3]]
+    try:
+        counts = count_features(precompute.conn, [(feat1, feat2) for feat1, feat2, _, _ in visible
+                                       if feat1 != 'kanji'],
+                                table=table, src=qsrc)
+    except Exception as e:
+        print(f"    {src_key} SKIP features: {e}", file=sys.stderr, flush=True)
+        counts = {}
+    feat_stats = []
+    for feat1, feat2, name, _ in visible:
+        try:
+            if (feat1, feat2) in counts:
+                data, summ = summarise_feature(counts[(feat1, feat2)], threshold)
+            else:
+                data, tests, summ = get_feature(
+                    precompute.conn, feat1, feat2, threshold,
+                    short=True, table=table, src=qsrc)
+            feat_stats.append({
+                'name': name,
+                'count': len(data),
+                'summ': summ,
+            })
+            print(f"    {src_key} {name}: {len(data)} categories", flush=True)
+        except Exception as e:
+            print(f"    {src_key} SKIP {name}: {e}", file=sys.stderr, flush=True)
+            continue
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
+    return src_key, encode({
+        'stats': stats_plain,
+        'feat_stats': feat_stats,
+    })
 
-    # Load existing data to allow incremental updates
-    all_data = {}
+
+def main(workers):
+    # Load existing data to allow incremental updates.  Each dataset is
+    # encoded once; saving just joins the encoded datasets.
+    fragments = {}
     if os.path.exists(OUT_PATH):
-        with open(OUT_PATH, 'r', encoding='utf-8') as f:
-            all_data = json.load(f)
+        with open(OUT_PATH, 'rb') as f:
+            fragments = {k: encode(v) for k, v in orjson.loads(f.read()).items()}
 
+    todo = []
     for src_key in db_options:
-        if src_key in all_data:
+        if src_key in fragments:
             print(f"  {src_key}: already computed, skipping")
-            continue
-
-        table = db_options[src_key][0]
-        qsrc = resolve_src(src_key)
+        else:
+            todo.append(src_key)
 
-        print(f"  {src_key} ({qsrc}, table={table}):", flush=True)
+    with computed(compute, todo, workers) as results:
+        for src_key, fragment in results:
+            if fragment is None:
+                continue
+            fragments[src_key] = fragment
 
-        # get_stats result
-        try:
-            stats = get_stats(conn, table=table, src=qsrc)
-        except Exception as e:
-            print(f"    SKIP stats: {e}", file=sys.stderr)
-            continue
+            # Write after each source to save progress
+            os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
+            with open(OUT_PATH, 'wb') as f:
+                f.write(b'{' + b','.join(encode(k) + b':' + v for k, v in fragments.items()) + b'}')
+            print(f"  Saved {src_key} ({len(fragments)} datasets so far)", flush=True)
 
-        # Convert nested defaultdict to plain dict for JSON
-        stats_plain = {}
-        for k1 in stats:
-            stats_plain[k1] = {}
-            for k2 in stats[k1]:
-                stats_plain[k1][k2] = dict(stats[k1][k2]) if hasattr(stats[k1][k2], 'items') else stats[k1][k2]
-
-        # Feature summaries (short=True → no examples or per-category tests)
-        feat_stats = []
-        for feat1, feat2, name, possible in features:
-            if src_key in possible:
-                try:
-                    data, tests, summ = get_feature(
-                        conn, feat1, feat2, threshold,
-                        short=True, table=table, src=qsrc)
-                    feat_stats.append({
-                        'name': name,
-                        'count': len(data),
-                        'summ': summ,
-                    })
-                    print(f"    {name}: {len(data)} categories", flush=True)
-                except Exception as e:
-                    print(f"    SKIP {name}: {e}", file=sys.stderr, flush=True)
-                    continue
-
-        all_data[src_key] = {
-            'stats': stats_plain,
-            'feat_stats': feat_stats,
-        }
-
-        # Write after each source to save progress
-        os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-        with open(OUT_PATH, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=1, cls=NumpyEncoder)
-        print(f"  Saved ({len(all_data)} datasets so far)", flush=True)
-
-    conn.close()
-    print(f"Done: {OUT_PATH} ({len(all_data)} datasets)")
+    print(f"Done: {OUT_PATH} ({len(fragments)} datasets)")
 
 
 if __name__ == '__main__':
-    main()
+    main(workers_arg())
@@ -2,20 +2,23 @@
 ###  Pre-compute top names data for all source/dtype/gender/n_top combos.
 ###  Saves results to web/static/data/topnames_data.json
 ###
+###  usage: python calc_topnames.py [workers]
+###  (defaults to one worker per CPU; each has its own read-only connection)
+###
 
-import sys, os, json, sqlite3
+import os
+import orjson
 
 from db import db_options, resolve_src, get_top_names
+import precompute
+from precompute import computed, skip, workers_arg
 
-DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
 OUT_PATH = os.path.join('..', 'web', 'static', 'data', 'topnames_data.json')
 
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    all_data = {}
+def jobs():
+    """(ds_key, src, dtype, gender, n_top, key) for each top names table, a dataset at a time"""
     seen = set()
-
     for src in db_options:
         qsrc = resolve_src(src)
         opt_dtypes = db_options[src][2]
@@ -24,41 +27,70 @@ def main():
         for dtype in dtype_list:
             if dtype == 'both':
                 continue
-            src_dtype_key = f"{qsrc}_{dtype}"
-            if src_dtype_key in seen:
-                continue
-            seen.add(src_dtype_key)
-
             ds_key = f"{qsrc}_{dtype}"
-            ds = {}
+            if ds_key in seen:
+                continue
+            seen.add(ds_key)
 
             for gender, gkey in [('M', 'male'), ('F', 'female')]:
                 for n_top, suffix in [(10, ''), (50, '_50')]:
-                    try:
-                        result = get_top_names(
-                            conn, src=qsrc, dtype=dtype,
-                            gender=gender, n_top=n_top)
-                    except Exception as e:
-                        print(f"  SKIP {ds_key} {gkey}{suffix}: {e}",
-                              file=sys.stderr)
-                        result = {'years': [], 'names_by_year': {}, 'number_ones': []}
-
-                    # Convert int keys to strings for JSON
-                    result['names_by_year'] = {
-                        str(k): v for k, v in result['names_by_year'].items()
-                    }
-                    ds[f'{gkey}{suffix}'] = result
-
-            all_data[ds_key] = ds
-            print(f"  {ds_key}: done")
-
-    conn.close()
+                    yield ds_key, qsrc, dtype, gender, n_top, f'{gkey}{suffix}'
+
 
+def compute(job):
+    """(ds_key, key, top names)"""
+    ds_key, qsrc, dtype, gender, n_top, key = job
+    try:
+        result = get_top_names(
+            precompute.conn, src=qsrc, dtype=dtype,
+            gender=gender, n_top=n_top)
+    except Exception as e:
+        skip(f"{ds_key} {key}", e)
+        result = {'years': [], 'names_by_year': {}, 'number_ones': []}
+
+    # (the int year keys are written as strings)
+    return ds_key, key, result
+
+
+def main(workers):
+    # Each dataset is written out as soon as it is done; the file only
+    # replaces the old one once it is complete
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=1)
-    print(f"Wrote {OUT_PATH} ({len(all_data)} datasets)")
+    tmp_path = OUT_PATH + '.tmp'
+    n_datasets = 0
+
+    def write(out, ds_key, ds):
+        nonlocal n_datasets
+        if n_datasets:
+            out.write(b',')
+        out.write(orjson.dumps(ds_key) + b':')
+        out.write(orjson.dumps(ds, option=orjson.OPT_NON_STR_KEYS))
+        n_datasets += 1
+        print(f"  {ds_key}: done")
+
+    try:
+        with computed(compute, jobs(), workers) as results, open(tmp_path, 'wb') as out:
+            out.write(b'{')
+            # the results come in job order, so each dataset's tables are together
+            ds_key, ds = None, {}
+            for key_of_ds, key, result in results:
+                if key_of_ds != ds_key:
+                    if ds_key is not None:
+                        write(out, ds_key, ds)
+                    ds_key, ds = key_of_ds, {}
+                ds[key] = result
+            if ds_key is not None:
+                write(out, ds_key, ds)
+            out.write(b'}')
+    except BaseException:
+        # leave the old file as it was
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, OUT_PATH)
+    print(f"Wrote {OUT_PATH} ({n_datasets} datasets)")
 
 
 if __name__ == '__main__':
-    main()
+    main(workers_arg())
@@ -2,10 +2,14 @@
 ###  Annotate data with various metadata
 ###
 
-import sqlite3
 import sys, os
+from functools import lru_cache
+from db import open_db
 from utils import whichScript, mora_hiragana, syllable_hiragana
 
+# names repeat across many rows, so only work out each script once
+whichScript = lru_cache(maxsize=None)(whichScript)
+
 
 #scriptdir = os.path.dirname(sys.argv[0])
 
@@ -13,7 +17,7 @@ if len(sys.argv) > 1:
     db  = sys.argv[1]
 else:
     db = "namae.db"
-conn = sqlite3.connect(db)
+conn = open_db(db)
 
   
 def tagName (conn):
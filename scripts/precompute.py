@@ -0,0 +1,57 @@
+###
+###  Shared by the calc_*_json precompute scripts: each job is computed
+###  with a read-only connection of its own, in a pool of worker
+###  processes (or in this process if there is only one worker).
+###
+###  compute(job) returns (key, result), with result None if the job
+###  was skipped; skip() reports why.
+###
+
+import sys, os
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from db import open_ro
+
+DB_PATH = os.path.join('..', 'web', 'db', 'namae.db')
+
+conn = None  # per process, set by _open()
+
+
+def _open(db_path):
+    global conn
+    conn = open_ro(db_path)
+
+
+def skip(key, err):
+    """Report a job that failed; its result is None"""
+    print(f"  SKIP {key}: {err}", file=sys.stderr, flush=True)
+    return None
+
+
+@contextmanager
+def computed(compute, jobs, workers, db_path=DB_PATH):
+    """
+    The results of compute(job) for each job, in order, computed in
+    workers processes (or here if workers is 1); the pool or connection
+    is closed when the with block ends, even if it fails
+    """
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open,
+                                 initargs=(db_path,)) as pool:
+            try:
+                yield pool.map(compute, jobs)
+            except BaseException:
+                pool.shutdown(cancel_futures=True)  # don't wait for the rest
+                raise
+    else:
+        _open(db_path)
+        try:
+            yield map(compute, jobs)
+        finally:
+            conn.close()
+
+
+def workers_arg():
+    """The number of workers given on the command line (default one per CPU)"""
+    return int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
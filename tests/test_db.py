@@ -276,3 +276,83 @@ class TestResolveSrc:
     def test_unknown(self):
         from web.db import resolve_src
         assert resolve_src('unknown') == 'unknown'
+
+
+# ── count_features ───────────────────────────────────────────────────
+
+class TestCountFeatures:
+    def test_matches_get_feature(self, tmp_path):
+        from web.db import count_features, summarise_feature, get_feature
+        c = sqlite3.connect(tmp_path / 'feat.db')
+        c.execute('CREATE TABLE namae (nid INTEGER PRIMARY KEY, gender, src)')
+        c.execute('CREATE TABLE attr (nid, char1, char_1, mora1)')
+        # the values are first seen out of sorted order, which get_feature uses
+        names = [('F', '花', '子', 'は'), ('M', '翔', '太', 'し'), ('M', '翔', '太', 'し'),
+                 ('F', '花', '子', None), ('F', '翔', '子', 'し'), ('M', '花', None, 'は'),
+                 ('F', '花', '子', 'は'), ('M', '翔', '太', None)]
+        for nid, (gender, c1, c_1, m1) in enumerate(names):
+            c.execute('INSERT INTO namae VALUES (?, ?, ?)', (nid, gender, 'bc'))
+            c.execute('INSERT INTO attr VALUES (?, ?, ?, ?)', (nid, c1, c_1, m1))
+        c.execute("INSERT INTO namae VALUES (99, 'M', 'hs')")
+        c.execute("INSERT INTO attr VALUES (99, '翔', '太', 'し')")
+        feats = [('char1', ''), ('char_1', 'mora1'), ('mora1', '')]
+        counts = count_features(c, feats, src='bc')
+        for feat1, feat2 in feats:
+            data, summ = summarise_feature(counts[(feat1, feat2)], 1)
+            want, _, want_summ = get_feature(c, feat1, feat2, 1, src='bc', short=True)
+            assert data == want
+            assert summ == want_summ
+        c.close()
+
+
+# ── fast_pragmas ─────────────────────────────────────────────────────
+
+class TestFastPragmas:
+    def test_sets_build_pragmas(self, tmp_path):
+        from web.db import fast_pragmas
+        c = fast_pragmas(sqlite3.connect(tmp_path / 'build.db'))
+        assert c.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert c.execute('PRAGMA synchronous').fetchone()[0] == 1   # NORMAL
+        assert c.execute('PRAGMA temp_store').fetchone()[0] == 2    # MEMORY
+        assert c.execute('PRAGMA cache_size').fetchone()[0] == -262144
+        c.close()
+
+    def test_open_db_applies_pragmas(self, tmp_path):
+        from web.db import open_db
+        c = open_db(tmp_path / 'build.db')
+        assert c.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert c.execute('PRAGMA temp_store').fetchone()[0] == 2
+        c.close()
+
+    def test_open_ro_is_read_only(self, tmp_path):
+        from web.db import open_ro
+        path = tmp_path / 'built.db'
+        w = sqlite3.connect(path)
+        w.execute('CREATE TABLE t (x)')
+        w.execute('INSERT INTO t VALUES (1)')
+        w.commit()
+        w.close()
+        c = open_ro(path)
+        assert c.execute('SELECT x FROM t').fetchone() == (1,)
+        assert c.execute('PRAGMA query_only').fetchone()[0] == 1
+        assert c.execute('PRAGMA temp_store').fetchone()[0] == 2
+        with pytest.raises(sqlite3.OperationalError):
+            c.execute('INSERT INTO t VALUES (2)')
+        c.close()
+
+
+# ── is_kanji ─────────────────────────────────────────────────────────
+
+class TestIsKanji:
+    def test_kanji(self):
+        from web.db import is_kanji
+        assert is_kanji('花')
+        assert is_kanji('㐂')           # Extension A
+        assert is_kanji('𠮷')           # Extension B
+
+    def test_not_kanji(self):
+        from web.db import is_kanji
+        assert not is_kanji('さ')
+        assert not is_kanji('ア')
+        assert not is_kanji('々')
+        assert not is_kanji('a')
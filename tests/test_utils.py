@@ -4,7 +4,7 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 import pytest
-from web.utils import mora_hiragana, syllable_hiragana, whichScript, expand_r
+from web.utils import mora_hiragana, syllable_hiragana, whichScript, expand_r, kata2hira
 
 
 # ── whichScript ──────────────────────────────────────────────────────
@@ -42,6 +42,25 @@ class TestWhichScript:
         assert whichScript('ア') == 'kata'
 
 
+# ── kata2hira ────────────────────────────────────────────────────────
+
+class TestKata2Hira:
+    def test_basic(self):
+        assert kata2hira('ハルト') == 'はると'
+
+    def test_small_and_voiced(self):
+        assert kata2hira('ヴァイオリン') == 'ゔぁいおりん'
+
+    def test_iteration_marks(self):
+        assert kata2hira('ヽヾ') == 'ゝゞ'
+
+    def test_long_vowel_and_dot_kept(self):
+        assert kata2hira('カタ・カナー') == 'かた・かなー'
+
+    def test_non_katakana_unchanged(self):
+        assert kata2hira('ゆい美') == 'ゆい美'
+
+
 # ── mora_hiragana ────────────────────────────────────────────────────
 
 class TestMoraHiragana:
@@ -1,5 +1,5 @@
 import sqlite3, os
-from collections import defaultdict as dd
+from collections import defaultdict as dd, Counter
 import numpy as np
 import scipy
 
@@ -273,9 +273,7 @@ def get_feature(conn, feat1, feat2, threshold, table='namae', src='bc', short=Fa
     c = conn.cursor()
 
     ddata = dd(lambda: dd(int))
-    data = list()
     tests = list()
-    summ = dict()
     examples = dd(list)
 
     if feat1 == 'kanji':
@@ -331,27 +329,9 @@ def get_feature(conn, feat1, feat2, threshold, table='namae', src='bc', short=Fa
                 examples[f"{ft1}, {ft2}"].append((orth, pron))
 
             
-    for key in ddata:
-        #print (key, ddata[key]['M'])
-        if ddata[key]['M'] + ddata[key]['F'] >  threshold:
-            data.append((key,
-                ddata[key]['M'],
-                ddata[key]['F'],
-                ddata[key]['F'] /  (ddata[key]['M'] + ddata[key]['F'])))
-
-    summ['allm'] = sum(d[1] for d in data)
-    summ['allf'] = sum(d[2] for d in data)
-    summ['allt'] = summ['allm'] + summ['allf']
+    data, summ = summarise_feature(ddata, threshold)
 
     print(feat1, feat2,   summ['allm'],  summ['allf'])
-    
-    CT = np.array([[d[1], d[2]] for d in data])
-    res = chi2_contingency(CT)
-
-    summ['chi2'] = res.statistic
-    summ['pval'] = res.pvalue
-    summ['phi'] = np.sqrt(res.statistic / summ['allt'] )
-    summ['lvl'] = 0.05 / len(data)
 
     if not short:
         ### Calculate Statistics
@@ -377,42 +357,91 @@ def get_feature(conn, feat1, feat2, threshold, table='namae', src='bc', short=Fa
     return data, tests, summ
 
 
-def get_name_features(conn, features, src='bc', dtype='orth'):
+def summarise_feature(ddata, threshold):
     """
-    Extract name data with specified features for classification.
-    
-    Parameters:
-    -----------
-    conn : sqlite3.Connection
-        Database connection
-    features : list of str
-        Feature names to extract. Can include:
-        - Any column from attr table: 'olength', 'char1', 'char_1', 'char_2', 
-          'mora1', 'mora_1', 'syll_1', 'uni_ch', 'script', etc.
-        - 'kanji' : extracts individual kanji as binary features
-        - 'char'  : extracts all characters (kanji, hiragana, katakana) as binary features
-        - 'year'  : include year information
-    table : str
-        Name table to query (default 'namae')
-    src : str or None
-        Source filter (default 'bc'). If None, gets all sources.
-    view : str
-        Attribute table/view name (default 'attr')
-    
-    Returns:
-    --------
-    name_data : list of dict
-        Each dict contains: {
-            'orth': orthography,
-            'pron': pronunciation,
-            'gender': gender label,
-            'year': year,
-            'features': dict of feature_name: feature_value
-        }
-    feature_vocab : dict
-        Vocabulary for each feature type (for encoding)
+    From ddata[category][gender] = count, the categories seen more than
+    threshold times as (category, M, F, proportion F), and their summary
+    (totals and the chi-square test over them): get_feature's data and summ
+    """
+    data = list()
+    summ = dict()
+    for key in ddata:
+        m, f = ddata[key].get('M', 0), ddata[key].get('F', 0)
+        if m + f >  threshold:
+            data.append((key, m, f, f /  (m + f)))
+
+    summ['allm'] = sum(d[1] for d in data)
+    summ['allf'] = sum(d[2] for d in data)
+    summ['allt'] = summ['allm'] + summ['allf']
+
+    CT = np.array([[d[1], d[2]] for d in data])
+    res = chi2_contingency(CT)
+
+    summ['chi2'] = res.statistic
+    summ['pval'] = res.pvalue
+    summ['phi'] = np.sqrt(res.statistic / summ['allt'] )
+    summ['lvl'] = 0.05 / len(data)
+    return data, summ
+
+
+def _group_order(value):
+    """Sort key for a GROUP BY value, in SQLite's order (numbers before text)"""
+    return (not isinstance(value, (int, float)), value)
+
+
+def count_features(conn, feats, table='namae', src='bc'):
+    """
+    ddata[category][gender] = count for several attr features at once,
+    as get_feature counts them (with the categories in the same order),
+    in one scan of attr:
+    {(feat1, feat2): ddata} for each (feat1, feat2) in feats
+    (feat2 may be '' for a single feature; not for 'kanji')
+    """
+    cols = list(dict.fromkeys(f for pair in feats for f in pair if f))
+    counts = {pair: dd(lambda: dd(int)) for pair in feats}
+    if not cols:
+        return counts
+    # values (or pairs of values) -> gender -> count, for each feature
+    found = {pair: dd(Counter) for pair in feats}
+    # where each feature's values are in the row (gender is first)
+    where = [(found[(feat1, feat2)], 1 + cols.index(feat1),
+              1 + cols.index(feat2) if feat2 else None)
+             for feat1, feat2 in feats]
+
+    c = conn.cursor()
+    c.execute(f"""
+    SELECT gender, {', '.join(cols)}
+    FROM attr LEFT JOIN {table} ON attr.nid={table}.nid
+    WHERE src = ?""", (src,))
+    # count the distinct rows in C, then split them by feature in Python
+    for row, n in Counter(c).items():
+        gender = row[0]
+        for values, i, j in where:
+            ft1 = row[i]
+            if ft1 is None:
+                continue
+            if j is None:
+                values[ft1][gender] += n
+            elif row[j] is not None:
+                values[(ft1, row[j])][gender] += n
+
+    # the categories in the order get_feature's GROUP BY gives them
+    for (feat1, feat2), values in found.items():
+        ddata = counts[(feat1, feat2)]
+        if feat2:
+            for ft1, ft2 in sorted(values, key=lambda k: tuple(map(_group_order, k))):
+                ddata[f"{ft1}, {ft2}"].update(values[(ft1, ft2)])
+        else:
+            for ft1 in sorted(values, key=_group_order):
+                ddata[ft1].update(values[ft1])
+    return counts
+
+
+def iter_name_features(conn, features, src='bc', dtype='orth'):
+    """
+    Yield (orth, pron, gender, year, feature_dict) for each gendered name,
+    as the query is read (see get_name_features for the features).
     """
-    
     c = conn.cursor()
     assert src in db_options, f"Source '{src}' not known (try: {', '.join(db_options.keys())})"
     yfrom, yto = db_options[src][3]
@@ -441,13 +470,6 @@ def get_name_features(conn, features, src='bc', dtype='orth'):
 
     c.execute(query, (src, yfrom, yto))
 
-
-
-    
-    # Collect data
-    name_data = []
-    feature_vocab = dd(set)
-    
     for row in c:
         orth, pron, gender, year = row[:4]
         
@@ -462,26 +484,74 @@ def get_name_features(conn, features, src='bc', dtype='orth'):
             value = row[4 + i]
             if value is not None:  # Only include non-null features
                 feature_dict[feat] = value
-                feature_vocab[feat].add(value)
         
         # Extract individual kanji if requested
         if 'kanji' in features and orth:
-            kanji_list = [ch for ch in orth if is_kanji(ch)]
-            for kanji in kanji_list:
-                feature_key = f'has_{kanji}'
-                feature_dict[feature_key] = 1  # Binary presence
-                feature_vocab['kanji'].add(kanji)
+            for ch in orth:
+                if is_kanji(ch):
+                    feature_dict[f'has_{ch}'] = 1  # Binary presence
         
         # Extract all characters if requested
         if 'char' in features and orth:
             for ch in orth:
-                feature_key = f'has_{ch}'
-                feature_dict[feature_key] = 1  # Binary presence
-                feature_vocab['char'].add(ch)
+                feature_dict[f'has_{ch}'] = 1  # Binary presence
         
         # Add year if requested
         if 'year' in features:
             feature_dict['year'] = year
+        
+        yield orth, pron, gender, year, feature_dict
+
+
+def get_name_features(conn, features, src='bc', dtype='orth'):
+    """
+    Extract name data with specified features for classification.
+    
+    Parameters:
+    -----------
+    conn : sqlite3.Connection
+        Database connection
+    features : list of str
+        Feature names to extract. Can include:
+        - Any column from attr table: 'olength', 'char1', 'char_1', 'char_2', 
+          'mora1', 'mora_1', 'syll_1', 'uni_ch', 'script', etc.
+        - 'kanji' : extracts individual kanji as binary features
+        - 'char'  : extracts all characters (kanji, hiragana, katakana) as binary features
+        - 'year'  : include year information
+    src : str or None
+        Source filter (default 'bc'). If None, gets all sources.
+    dtype : str
+        'orth' or 'pron': only names with that field
+    
+    Returns:
+    --------
+    name_data : list of dict
+        Each dict contains: {
+            'orth': orthography,
+            'pron': pronunciation,
+            'gender': gender label,
+            'year': year,
+            'features': dict of feature_name: feature_value
+        }
+    feature_vocab : dict
+        Vocabulary for each feature type (for encoding)
+    """
+    attr_cols = [f for f in features if f not in ['kanji', 'char', 'year']]
+
+    # Collect data
+    name_data = []
+    feature_vocab = dd(set)
+    
+    for orth, pron, gender, year, feature_dict in iter_name_features(
+            conn, features, src=src, dtype=dtype):
+        for feat in attr_cols:
+            if feat in feature_dict:
+                feature_vocab[feat].add(feature_dict[feat])
+        if 'kanji' in features and orth:
+            feature_vocab['kanji'].update(ch for ch in orth if is_kanji(ch))
+        if 'char' in features and orth:
+            feature_vocab['char'].update(orth)
+        if 'year' in features:
             feature_vocab['year'].add(year)
         
         name_data.append({
@@ -766,6 +836,50 @@ def get_readings(conn, kanjis):
 
     
 
+def fast_pragmas(conn):
+    """
+    Tune a connection for bulk loading while building the database.
+
+    WAL with synchronous=NORMAL only syncs at checkpoints, and temporary
+    tables, sorts and a large page cache stay in memory.
+    """
+    conn.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-262144;
+    ''')
+    return conn
+
+
+def open_db(db_path):
+    """
+    Open a database for building, with fast_pragmas() already applied.
+    """
+    return fast_pragmas(sqlite3.connect(db_path))
+
+
+def open_ro(db_path):
+    """
+    Open a built database read-only, for the scripts that only query it.
+
+    Several of these can read the same file at once (e.g. one per worker),
+    so pages are read through a shared memory map rather than each
+    connection's own cache, which is kept moderate.
+    """
+    from urllib.request import pathname2url
+    uri = 'file:' + pathname2url(os.path.abspath(db_path)) + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    conn.executescript('''
+    PRAGMA query_only=ON;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=1073741824;
+    PRAGMA cache_size=-65536;
+    ''')
+    return conn
+
+
 def cache_years(db_path, src):
     """
     Store the number of names per year in the database for a given source.
@@ -773,7 +887,7 @@ def cache_years(db_path, src):
     Args:
         src (str): The source identifier for the data.
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     c = conn.cursor()
 
     for dtype in  ('orth', 'pron'):
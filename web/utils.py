@@ -1,5 +1,11 @@
 import regex
 
+# compiled once; whichScript() runs for every name in the build
+_KATA_ONLY = regex.compile(r'^[\p{scx=Katakana}]+$')
+_HIRA_ONLY = regex.compile(r'^[\p{scx=Hiragana}]+$')
+_HAS_HIRA = regex.compile(r'[\p{scx=Hiragana}]')
+_HAS_KATA = regex.compile(r'[\p{scx=Katakana}]')
+
 _YOON = {"ゃ", "ゅ", "ょ", "ぁ", "ぃ", "ぇ", "ゎ"}    # Obsolete:  ゎ ぇ o, u
 
 _OWARI = {"ん", "っ"}
@@ -129,17 +135,31 @@ def whichScript (name):
     >>> whichScript ("耀士郎")
     'kanji'
     """
-    if regex.match(r'^[\p{scx=Katakana}]+$', name):
+    if _KATA_ONLY.match(name):
         return 'kata'
-    elif regex.match(r'^[\p{scx=Hiragana}]+$', name):
+    elif _HIRA_ONLY.match(name):
         return 'hira'
-    elif regex.search(r'[\p{scx=Hiragana}]', name): 
+    elif _HAS_HIRA.search(name):
         return 'mixhira'
-    elif regex.search(r'[\p{scx=Katakana}]', name):
+    elif _HAS_KATA.search(name):
         return 'mixkata'
     else:
         return 'kanji'
 
+# ァ..ヶ and ヽヾ sit 0x60 above their hiragana; the rest (ー, ・) are kept
+_KATA2HIRA = str.maketrans({chr(c): chr(c - 0x60)
+                            for c in [*range(0x30A1, 0x30F7), 0x30FD, 0x30FE]})
+
+def kata2hira(kana):
+    """
+    convert katakana to hiragana (same mapping as jaconv.kata2hira)
+    >>> kata2hira("カタ・カナー")
+    'かた・かなー'
+    >>> kata2hira("ヴァイオリン")
+    'ゔぁいおりん'
+    """
+    return kana.translate(_KATA2HIRA)
+
 def mora_hiragana(word):
   """Splits a Japanese word in hiragana into mora.
 
@@ -171,7 +191,7 @@ def mora_hiragana(word):
   if not word:
     return []
   else:
-    assert regex.match(r'^[\p{scx=Hiragana}]+$', word), "not Hiragana"
+    assert _HIRA_ONLY.match(word), "not Hiragana"
   mora = []
   for char in word:
     if char in _YOON: